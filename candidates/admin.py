@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from django import forms
 from django.contrib import admin
 from django.db.models import Q
 
@@ -13,6 +14,23 @@ from .models import (
 )
 
 
+class ChangelistOnlyMixin:
+    """
+    يقصر SELECT في صفحة القائمة (changelist) على الأعمدة المعروضة فقط
+    عبر changelist_only_fields. صفحة التعديل تبقى بكامل الحقول.
+    """
+
+    changelist_only_fields: tuple[str, ...] = ()
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        match = getattr(request, "resolver_match", None)
+        opts = self.model._meta
+        if self.changelist_only_fields and match and match.url_name == f"{opts.app_label}_{opts.model_name}_changelist":
+            qs = qs.only(*self.changelist_only_fields)
+        return qs
+
+
 # ==========================================================
 # Opportunity
 # ==========================================================
@@ -36,6 +54,7 @@ class CommitteeAdmin(admin.ModelAdmin):
     search_fields = ("name", "opportunity__name")
     ordering = ("opportunity", "name")
     list_select_related = ("opportunity",)
+    autocomplete_fields = ("opportunity",)
 
 
 # ==========================================================
@@ -45,10 +64,16 @@ class CommitteeAdmin(admin.ModelAdmin):
 @admin.register(MemberProfile)
 class MemberProfileAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "role", "national_id", "mobile_last4", "opportunity", "committee", "is_active")
-    list_filter = ("role", "is_active", "opportunity", "committee")
+    list_filter = (
+        "role",
+        "is_active",
+        ("opportunity", admin.RelatedOnlyFieldListFilter),
+        ("committee", admin.RelatedOnlyFieldListFilter),
+    )
     search_fields = ("user__username", "user__first_name", "user__last_name", "national_id")
     ordering = ("role", "user__username")
     list_select_related = ("user", "opportunity", "committee")
+    autocomplete_fields = ("user", "opportunity", "committee")
 
     # منع الأخطاء الشائعة في الإدخال
     def get_form(self, request, obj=None, **kwargs):
@@ -63,7 +88,7 @@ class MemberProfileAdmin(admin.ModelAdmin):
 # ==========================================================
 
 @admin.register(Candidate)
-class CandidateAdmin(admin.ModelAdmin):
+class CandidateAdmin(ChangelistOnlyMixin, admin.ModelAdmin):
     list_display = (
         "id",
         "full_name",
@@ -76,10 +101,30 @@ class CandidateAdmin(admin.ModelAdmin):
         "file_not_eligible",
         "is_finalized",
     )
-    list_filter = ("opportunity", "assigned_committee", "sector", "file_not_eligible", "is_finalized")
+    # sector متاح عبر البحث؛ كفلتر يولّد DISTINCT على قيم كثيرة في كل تحميل للصفحة
+    list_filter = (
+        ("opportunity", admin.RelatedOnlyFieldListFilter),
+        ("assigned_committee", admin.RelatedOnlyFieldListFilter),
+        "file_not_eligible",
+        "is_finalized",
+    )
     search_fields = ("full_name", "national_id", "school", "sector", "opportunity__name")
     ordering = ("opportunity", "full_name")
-    list_select_related = ("opportunity", "assigned_committee")
+    # assigned_committee__opportunity: لأن __str__ اللجنة يعرض الفرصة
+    list_select_related = ("opportunity", "assigned_committee__opportunity")
+    changelist_only_fields = (
+        "full_name",
+        "national_id",
+        "opportunity__name",
+        "assigned_committee__name",
+        "assigned_committee__opportunity__name",
+        "sector",
+        "school",
+        "file_score",
+        "file_not_eligible",
+        "is_finalized",
+    )
+    autocomplete_fields = ("opportunity", "assigned_committee", "file_reviewer", "finalized_by")
 
     readonly_fields = ("file_scored_at", "finalized_at")
 
@@ -128,28 +173,65 @@ class CandidateAdmin(admin.ModelAdmin):
         }),
     )
 
-    # فلتر سريع "جاهز للتوزيع" (تقييم ملف أو مستبعد)
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.select_related("opportunity", "assigned_committee", "file_reviewer", "finalized_by")
-
 
 # ==========================================================
 # InterviewScore
 # ==========================================================
 
+class InterviewScoreAdminForm(forms.ModelForm):
+    """الدرجة تُحرَّر عشرية (0-50) وتُخزَّن في score_x100 عبر InterviewScore.score"""
+
+    score = forms.DecimalField(
+        label="درجة المقابلة (0-50)",
+        min_value=0,
+        max_value=50,
+        max_digits=5,
+        decimal_places=2,
+    )
+
+    class Meta:
+        model = InterviewScore
+        exclude = ("score_x100",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields["score"].initial = self.instance.score
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get("score") is not None:
+            self.instance.score = cleaned["score"]
+        return cleaned
+
+
 @admin.register(InterviewScore)
-class InterviewScoreAdmin(admin.ModelAdmin):
-    list_display = ("id", "committee", "candidate", "member", "score", "created_at")
-    list_filter = ("committee", "member")
+class InterviewScoreAdmin(ChangelistOnlyMixin, admin.ModelAdmin):
+    form = InterviewScoreAdminForm
+    list_display = ("id", "committee", "candidate", "member", "score_display", "created_at")
+    list_filter = (
+        ("committee", admin.RelatedOnlyFieldListFilter),
+        ("member", admin.RelatedOnlyFieldListFilter),
+    )
     search_fields = ("candidate__full_name", "candidate__national_id", "member__username")
     ordering = ("-created_at",)
-    list_select_related = ("committee", "candidate", "member")
+    list_select_related = ("committee__opportunity", "candidate", "member")
+    changelist_only_fields = (
+        "committee__name",
+        "committee__opportunity__name",
+        "candidate__full_name",
+        "candidate__national_id",
+        "member__username",
+        "score_x100",
+        "created_at",
+    )
+    autocomplete_fields = ("committee", "candidate", "member")
 
     readonly_fields = ("created_at",)
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related("committee", "candidate", "member")
+    @admin.display(description="درجة المقابلة (0-50)", ordering="score_x100")
+    def score_display(self, obj: InterviewScore):
+        return obj.score
 
 
 # ==========================================================
@@ -157,14 +239,22 @@ class InterviewScoreAdmin(admin.ModelAdmin):
 # ==========================================================
 
 @admin.register(FinalDecision)
-class FinalDecisionAdmin(admin.ModelAdmin):
+class FinalDecisionAdmin(ChangelistOnlyMixin, admin.ModelAdmin):
     list_display = ("id", "committee", "candidate", "is_nominated", "final_score_value", "submitted_by", "submitted_at")
     list_filter = ("committee", "is_nominated")
     search_fields = ("candidate__full_name", "candidate__national_id", "submitted_by__username")
     ordering = ("-submitted_at",)
-    list_select_related = ("committee", "candidate", "submitted_by")
+    list_select_related = ("committee__opportunity", "candidate", "submitted_by")
+    changelist_only_fields = (
+        "committee__name",
+        "committee__opportunity__name",
+        "candidate__full_name",
+        "candidate__national_id",
+        "is_nominated",
+        "final_score_value",
+        "submitted_by__username",
+        "submitted_at",
+    )
+    autocomplete_fields = ("committee", "candidate", "submitted_by")
 
     readonly_fields = ("submitted_at",)
-
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related("committee", "candidate", "submitted_by")
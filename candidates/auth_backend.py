@@ -24,22 +24,30 @@ class NationalIdLast4Backend(BaseBackend):
         if not national_id or not last4:
             return None
 
-        prof = (
+        # نكتفي بعمودين من الـ index (national_id, mobile_last4) بدل JOIN مع User
+        row = (
             MemberProfile.objects
-            .select_related("user")
-            .filter(national_id=national_id, last4=last4)
+            .filter(national_id=national_id, mobile_last4=last4, is_active=True)
+            .values_list("user_id", "role")
             .first()
         )
-        if not prof or not prof.is_active:
+        if not row:
             return None
 
-        if required_role and prof.role != required_role:
+        user_id, role = row
+        if required_role and role != required_role:
             return None
 
-        return prof.user
+        return self.get_user(user_id)
 
     def get_user(self, user_id):
+        # يُستدعى مع كل طلب (AuthenticationMiddleware): المستخدم + profile + الفرصة/اللجنة
+        # باستعلام واحد، فلا يكلّف request.user.profile.opportunity/committee أي استعلام لاحق
         try:
-            return User.objects.get(pk=user_id)
+            return User.objects.select_related(
+                "profile",
+                "profile__opportunity",
+                "profile__committee",
+            ).get(pk=user_id)
         except User.DoesNotExist:
             return None
@@ -46,118 +46,112 @@ class Command(BaseCommand):
         if (chairs or members) and not committee_name:
             raise CommandError("--committee is required when assigning --chairs or --members")
 
-        # Resolve / create active opportunity
-        opp = Opportunity.objects.filter(is_active=True).first()
-        if not opp:
-            if not opp_title:
-                opp_title = "فرصة افتراضية"
-            if dry_run:
-                self.stdout.write(self.style.WARNING(f"[DRY] Would create active Opportunity: {opp_title}"))
-                opp = None
-            else:
-                opp = Opportunity.objects.create(title=opp_title, is_active=True)
-
-        # Resolve / create committee if needed
-        com = None
-        if committee_name:
-            com_qs = Committee.objects.filter(name=committee_name)
-            if opp:
-                com_qs = com_qs.filter(opportunity=opp)
-            com = com_qs.first()
-
-            if not com:
-                if dry_run:
-                    self.stdout.write(self.style.WARNING(f"[DRY] Would create Committee: {committee_name}"))
-                    com = None
-                else:
-                    if not opp:
-                        raise CommandError("No active opportunity available to create committee.")
-                    com = Committee.objects.create(opportunity=opp, name=committee_name, is_open=True)
-
-        def get_or_create_profile(u: User):
-            p = getattr(u, "profile", None)
-            if p:
-                return p
-            if dry_run:
-                self.stdout.write(self.style.WARNING(f"[DRY] Would create MemberProfile for user={u.username}"))
-                return None
-            return MemberProfile.objects.create(
-                user=u,
-                is_active=False,
-                role=MemberProfile.ROLE_MEMBER,
-            )
-
-        def assign(u: User, role: str):
-            p = get_or_create_profile(u)
-
-            # print plan
-            link_info = ""
-            if role == MemberProfile.ROLE_SUPERVISOR:
-                link_info = f"opportunity={getattr(opp, 'id', None)}"
-            elif role in (MemberProfile.ROLE_MEMBER, MemberProfile.ROLE_CHAIR):
-                link_info = f"committee={getattr(com, 'id', None)}"
-            elif role == MemberProfile.ROLE_ADMIN:
-                link_info = f"opportunity={getattr(opp, 'id', None)}"
-
-            if dry_run:
-                self.stdout.write(f"[DRY] {u.username}: role={role}, activate={activate}, {link_info}")
-                return
-
-            if not p:
-                p = MemberProfile.objects.get(user=u)
-
+        def apply_role(p: MemberProfile, role: str):
             p.role = role
             if activate:
                 p.is_active = True
 
             # clear old links safely
-            if hasattr(p, "committee_id"):
-                p.committee = None
-            if hasattr(p, "opportunity_id"):
-                p.opportunity = None
+            p.committee = None
+            p.opportunity = None
 
             if role == MemberProfile.ROLE_SUPERVISOR:
-                if not hasattr(p, "opportunity_id"):
-                    raise CommandError("MemberProfile has no opportunity field.")
                 p.opportunity = opp
-
             elif role in (MemberProfile.ROLE_MEMBER, MemberProfile.ROLE_CHAIR):
-                if not hasattr(p, "committee_id"):
-                    raise CommandError("MemberProfile has no committee field.")
                 p.committee = com
-
             elif role == MemberProfile.ROLE_ADMIN:
-                # Admin: اربطه بالفرصة إن كان الحقل موجود
-                if hasattr(p, "opportunity_id"):
-                    p.opportunity = opp
+                # Admin: اربطه بالفرصة
+                p.opportunity = opp
 
-            p.save()
+        def link_info(role: str) -> str:
+            if role in (MemberProfile.ROLE_MEMBER, MemberProfile.ROLE_CHAIR):
+                return f"committee={getattr(com, 'id', None)}"
+            return f"opportunity={getattr(opp, 'id', None)}"
 
-        def fetch_users(usernames: list[str]) -> list[User]:
+        def fetch_users(usernames: list[str]) -> dict[str, User]:
             if not usernames:
-                return []
-            found = list(User.objects.filter(username__in=usernames))
-            missing = sorted(set(usernames) - {u.username for u in found})
+                return {}
+            found = {u.username: u for u in User.objects.filter(username__in=usernames).select_related("profile")}
+            missing = sorted(n for n in usernames if n not in found)
             if missing:
                 raise CommandError(f"Users not found: {', '.join(missing)}")
             return found
 
-        # Execute assignments
+        # ======================================================
+        # Phase 1: قراءة + تحقق + خطة (بدون transaction وبدون كتابة)
+        # ======================================================
+
+        # username -> role (الترتيب: مشرف ثم رئيس ثم عضو ثم إدارة؛ الأخير يغلب)
+        role_by_username: dict[str, str] = {}
+        for role, usernames in (
+            (MemberProfile.ROLE_SUPERVISOR, supervisors),
+            (MemberProfile.ROLE_CHAIR, chairs),
+            (MemberProfile.ROLE_MEMBER, members),
+            (MemberProfile.ROLE_ADMIN, admins),
+        ):
+            for username in usernames:
+                role_by_username[username] = role
+
+        users = fetch_users(list(role_by_username))
+
+        # Resolve active opportunity
+        opp = Opportunity.objects.filter(is_active=True).first()
+        if not opp and not opp_title:
+            opp_title = "فرصة افتراضية"
+
+        # Resolve committee if needed
+        com = None
+        if committee_name:
+            com_qs = Committee.objects.filter(name=committee_name)
+            if opp:
+                com_qs = com_qs.filter(opportunity=opp)
+            com = com_qs.first()
+
+        plan = [(users[username], role) for username, role in role_by_username.items()]
+
+        if dry_run:
+            if not opp:
+                self.stdout.write(self.style.WARNING(f"[DRY] Would create active Opportunity: {opp_title}"))
+            if committee_name and not com:
+                self.stdout.write(self.style.WARNING(f"[DRY] Would create Committee: {committee_name}"))
+
+            for u, role in plan:
+                if not hasattr(u, "profile"):
+                    self.stdout.write(self.style.WARNING(f"[DRY] Would create MemberProfile for user={u.username}"))
+                self.stdout.write(f"[DRY] {u.username}: role={role}, activate={activate}, {link_info(role)}")
+
+            self.stdout.write(self.style.SUCCESS("Done."))
+            return
+
+        # ======================================================
+        # Phase 2: الكتابة فقط داخل transaction قصيرة
+        # ======================================================
         with transaction.atomic():
-            for u in fetch_users(supervisors):
-                assign(u, MemberProfile.ROLE_SUPERVISOR)
+            if not opp:
+                opp = Opportunity.objects.create(name=opp_title, is_active=True)
 
-            for u in fetch_users(chairs):
-                assign(u, MemberProfile.ROLE_CHAIR)
+            if committee_name and not com:
+                com = Committee.objects.create(opportunity=opp, name=committee_name, is_open=True)
 
-            for u in fetch_users(members):
-                assign(u, MemberProfile.ROLE_MEMBER)
+            profiles_to_create: list[MemberProfile] = []
+            profiles_to_update: list[MemberProfile] = []
 
-            for u in fetch_users(admins):
-                assign(u, MemberProfile.ROLE_ADMIN)
+            for u, role in plan:
+                if hasattr(u, "profile"):
+                    p = u.profile
+                    profiles_to_update.append(p)
+                else:
+                    # يُنشأ بالدور والربط النهائي مباشرة (حتى لا يخالف قيد اللجنة)
+                    p = MemberProfile(user=u, is_active=False)
+                    profiles_to_create.append(p)
 
-            if dry_run:
-                # rollback intentional
-                transaction.set_rollback(True)
+                apply_role(p, role)
+
+            MemberProfile.objects.bulk_create(profiles_to_create)
+            MemberProfile.objects.bulk_update(
+                profiles_to_update,
+                fields=["role", "is_active", "opportunity", "committee"],
+                batch_size=200,
+            )
 
         self.stdout.write(self.style.SUCCESS("Done."))
@@ -2,12 +2,12 @@
 from __future__ import annotations
 
 from pathlib import Path
-import re
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from openpyxl import load_workbook
 
+from candidates.management.digits import DIGITS_ONLY
 from candidates.models import Candidate, Opportunity, Committee
 
 
@@ -30,6 +30,11 @@ AR_MAP = {
     "رابط السيرة الذاتية": "cv_url",
 }
 
+# الحقول المحدّثة عند الاستيراد (السجل المدني هو المفتاح ولا يُحدَّث)
+FIELD_NAMES = [f for f in AR_MAP.values() if f != "national_id"]
+
+BATCH_SIZE = 500
+
 
 def clean_str(v) -> str:
     if v is None:
@@ -47,12 +52,37 @@ def clean_int(v) -> int:
         return 0
 
 
+def cell_value(row_tuple: tuple, i: int):
+    # في وضع read_only قد تأتي الصفوف أقصر من صف العناوين
+    return row_tuple[i] if i < len(row_tuple) else None
+
+
 def normalize_mobile(v: str) -> str:
-    digits = re.sub(r"\D+", "", clean_str(v))
+    digits = clean_str(v).translate(DIGITS_ONLY)
     # أحيانًا يجي 9665xxxxxxxx — نخليه كما هو (أرقام فقط)
     return digits
 
 
+# منظّف كل حقل عند الاستيراد (الافتراضي clean_str)
+CLEANERS = {
+    "mobile": normalize_mobile,
+    "years_director": clean_int,
+    "years_deputy": clean_int,
+}
+
+
+def _resolve_opportunity_id(name: str) -> int:
+    return Opportunity.objects.get_or_create(name=name, defaults={"is_active": True})[0].pk
+
+
+def _resolve_committee_id(opportunity_id: int, name: str) -> int:
+    return Committee.objects.get_or_create(
+        opportunity_id=opportunity_id,
+        name=name,
+        defaults={"is_open": True},
+    )[0].pk
+
+
 class Command(BaseCommand):
     help = "Import candidates from Arabic Excel headers into DB."
 
@@ -72,75 +102,78 @@ class Command(BaseCommand):
         if not opp_name:
             raise CommandError("--opportunity is required and must not be empty.")
 
-        opportunity, _ = Opportunity.objects.get_or_create(name=opp_name, defaults={"is_active": True})
+        opportunity_id = _resolve_opportunity_id(opp_name)
 
         committee_name = clean_str(opts["committee"])
         assign = bool(opts["assign"])
 
-        committee = None
-        if committee_name:
-            committee, _ = Committee.objects.get_or_create(
-                opportunity=opportunity,
-                name=committee_name,
-                defaults={"is_open": True},
-            )
-
-        wb = load_workbook(xlsx_path)
-        ws = wb.active
-
-        # header row
-        headers = [clean_str(ws.cell(1, c).value) for c in range(1, ws.max_column + 1)]
-        idx = {h: i for i, h in enumerate(headers)}
-
-        missing = [h for h in AR_MAP.keys() if h not in idx]
-        if missing:
-            raise CommandError(f"Missing columns in Excel: {missing}")
-
-        created = 0
-        updated = 0
-        skipped = 0
-
-        for r in range(2, ws.max_row + 1):
-            row = {h: ws.cell(r, idx[h] + 1).value for h in AR_MAP.keys()}
-
-            national_id = clean_str(row["السجل المدني"])
-            full_name = clean_str(row["اسم المتقدم"])
-            if not national_id or not full_name:
-                skipped += 1
-                continue
-
-            defaults = {
-                "full_name": full_name,
-                "mobile": normalize_mobile(row["رقم الجوال"]),
-                "specialization": clean_str(row["التخصص"]),
-                "rank": clean_str(row["الرتبة الوظيفية"]),
-                "current_work": clean_str(row["العمل الحالي"]),
-                "start_date_hijri": clean_str(row["تاريخ المباشرة (هجري)"]),
-                "school": clean_str(row["مدرسة المتقدم"]),
-                "sector": clean_str(row["قطاع المتقدم"]),
-                "applied_position": clean_str(row["الوظيفة المتقدم عليها"]),
-                "opportunity_school": clean_str(row["مدرسة الفرصة"]),
-                "opportunity_sector": clean_str(row["قطاع الفرصة"]),
-                "admin_exp": clean_str(row["سبق العمل في الإدارة المدرسية"]),
-                "years_director": clean_int(row["سنوات عمل مدير"]),
-                "years_deputy": clean_int(row["سنوات عمل وكيل"]),
-                "cv_url": clean_str(row["رابط السيرة الذاتية"]),
-            }
-
-            obj, is_created = Candidate.objects.update_or_create(
-                opportunity=opportunity,
-                national_id=national_id,
-                defaults=defaults,
-            )
-
-            if committee and assign:
-                obj.assigned_committee = committee
-                obj.save(update_fields=["assigned_committee"])
-
-            created += 1 if is_created else 0
-            updated += 0 if is_created else 1
+        committee_id = _resolve_committee_id(opportunity_id, committee_name) if committee_name else None
+
+        # read_only: قراءة متدفقة صفًا بصف بدل تحميل الملف كاملًا في الذاكرة
+        wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+        try:
+            ws = wb.active
+            rows_iter = ws.iter_rows(values_only=True)
+
+            # header row
+            header_values = next(rows_iter, ())
+            idx = {clean_str(h): i for i, h in enumerate(header_values)}
+
+            missing = [h for h in AR_MAP.keys() if h not in idx]
+            if missing:
+                raise CommandError(f"Missing columns in Excel: {missing}")
+
+            # مواقع الأعمدة + منظّف كل حقل تُحسب مرة واحدة خارج حلقة الصفوف
+            nid_col = idx["السجل المدني"]
+            field_cols = [(f, idx[h], CLEANERS.get(f, clean_str)) for h, f in AR_MAP.items() if f != "national_id"]
+
+            skipped = 0
+            rows: list[tuple[str, dict]] = []
+
+            for row_tuple in rows_iter:
+                # صفوف فارغة تمامًا (تنسيق بعد نهاية البيانات) لا تُحتسب
+                if all(v is None for v in row_tuple):
+                    continue
+
+                national_id = clean_str(cell_value(row_tuple, nid_col))
+                defaults = {f: clean(cell_value(row_tuple, c)) for f, c, clean in field_cols}
+                if not national_id or not defaults["full_name"]:
+                    skipped += 1
+                    continue
+
+                rows.append((national_id, defaults))
+        finally:
+            wb.close()
+
+        # نفس السجل المدني مكرر في الملف؟ آخر صف هو المعتمد (كما كان update_or_create)
+        by_nid = dict(rows)
+
+        do_assign = bool(committee_id and assign)
+        if do_assign:
+            for defaults in by_nid.values():
+                # اللجنة جزء من نفس الكتابة (لا حفظ ثانٍ لكل مرشح)
+                defaults["assigned_committee_id"] = committee_id
+
+        # للتقرير فقط: كم سجل موجود مسبقًا (COUNT بدل جلب الصفوف)
+        updated = Candidate.objects.filter(
+            opportunity_id=opportunity_id,
+            national_id__in=list(by_nid.keys()),
+        ).count()
+        created = len(by_nid) - updated
+
+        # upsert واحد: INSERT ... ON CONFLICT (opportunity, national_id) DO UPDATE
+        Candidate.objects.bulk_create(
+            [
+                Candidate(opportunity_id=opportunity_id, national_id=national_id, **defaults)
+                for national_id, defaults in by_nid.items()
+            ],
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["opportunity", "national_id"],
+            update_fields=list(FIELD_NAMES) + (["assigned_committee"] if do_assign else []),
+        )
 
         self.stdout.write(self.style.SUCCESS(
-            f"Import done: created={created}, updated={updated}, skipped={skipped}, opportunity='{opportunity.name}'"
-            + (f", committee='{committee.name}', assigned={assign}" if committee else "")
+            f"Import done: created={created}, updated={updated}, skipped={skipped}, opportunity='{opp_name}'"
+            + (f", committee='{committee_name}', assigned={assign}" if committee_id else "")
         ))
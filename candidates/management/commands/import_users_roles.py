@@ -1,31 +1,42 @@
 # candidates/management/commands/import_users_roles.py
 from __future__ import annotations
 
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import Any, Optional, Sequence
+from functools import lru_cache
+from io import BytesIO
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Sequence
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from django.db.models.signals import post_save
 
 from openpyxl import load_workbook
-from openpyxl.worksheet.worksheet import Worksheet
 
+from candidates.management.digits import DIGITS_ONLY_ASCII
 from candidates.models import Committee, MemberProfile
 
-# ✅ signal الذي كان يسبب مشكلة إنشاء MemberProfile بدون committee
-# عدّل المسار إذا كان عندك مختلف
-from candidates.signals import ensure_profile  # noqa: F401
-
 User = get_user_model()
 
 
 # ======================================================
 # Helpers
 # ======================================================
+# كل المسافات التي يحذفها str.split() (+ zero-width space الشائع في ملفات Excel)
+_WS_TRANS = str.maketrans("", "", "".join(
+    chr(c)
+    for c in (
+        *range(0x09, 0x0E), *range(0x1C, 0x21), 0x85, 0xA0, 0x1680,
+        *range(0x2000, 0x200C), 0x2028, 0x2029, 0x202F, 0x205F, 0x3000,
+    )
+))
+
+
 def _norm(s: str) -> str:
-    return "".join(str(s).strip().lower().split())
+    return str(s).translate(_WS_TRANS).lower()
 
 
 def _s(v: Any) -> str:
@@ -33,19 +44,15 @@ def _s(v: Any) -> str:
 
 
 def _digits_only(v: Any) -> str:
-    s = _s(v)
-    return "".join(ch for ch in s if ch.isdigit())
+    # السجل المدني بالأرقام اللاتينية حتى يطابق ما يُكتب عند الدخول
+    return _s(v).translate(DIGITS_ONLY_ASCII)
 
 
-def _bool(v: Any) -> bool:
-    if v is None:
-        return False
-    if isinstance(v, bool):
-        return v
-    s = str(v).strip().lower()
-    return s in {"1", "true", "yes", "y", "نعم", "صح", "فعال", "مفعل", "نشط"}
+# قيم "مفعّل" في عمود التفعيل (بعد strip + lower)
+_TRUE = frozenset({"1", "true", "yes", "y", "نعم", "صح", "فعال", "مفعل", "نشط"})
 
 
+@lru_cache(maxsize=None)
 def _has_field(model_cls, field_name: str) -> bool:
     try:
         model_cls._meta.get_field(field_name)
@@ -54,23 +61,25 @@ def _has_field(model_cls, field_name: str) -> bool:
         return False
 
 
-def _get_header_map(ws: Worksheet) -> dict[str, int]:
+def _get_header_map(rows_iter: Iterator[tuple]) -> dict[str, int]:
     """
     returns: normalized_header -> 1-based column index
+    يستهلك من rows_iter حتى صف العناوين فقط (ضمن أول 10 صفوف)،
+    فيبقى rows_iter واقفًا على أول صف بيانات.
     """
     header_row = None
-    for r in range(1, min(10, ws.max_row) + 1):
-        vals = [ws.cell(row=r, column=c).value for c in range(1, ws.max_column + 1)]
+    header_vals: tuple = ()
+    for r, vals in enumerate(islice(rows_iter, 10), start=1):
         non_empty = [v for v in vals if v not in (None, "", " ")]
         if len(non_empty) >= 2:
             header_row = r
+            header_vals = vals
             break
     if not header_row:
         raise CommandError("لم يتم العثور على صف عناوين (header) في الملف.")
 
     m: dict[str, int] = {}
-    for c in range(1, ws.max_column + 1):
-        v = ws.cell(row=header_row, column=c).value
+    for c, v in enumerate(header_vals, start=1):
         if v is None:
             continue
         key = _norm(str(v))
@@ -80,43 +89,37 @@ def _get_header_map(ws: Worksheet) -> dict[str, int]:
     return m
 
 
-def _col(header_map: dict[str, int], names: Sequence[str]) -> Optional[int]:
-    for n in names:
-        k = _norm(n)
-        if k in header_map:
-            return header_map[k]
-    return None
+def _col(header_map: dict[str, int], keys: Sequence[str]) -> Optional[int]:
+    """keys: أسماء أعمدة مطبّعة مسبقًا (COLUMN_KEYS) — أول اسم موجود يفوز"""
+    return next((header_map[k] for k in keys if k in header_map), None)
 
 
-def _get_cell(ws: Worksheet, row: int, col: Optional[int]) -> Any:
-    if not col:
-        return None
-    return ws.cell(row=row, column=col).value
-
-
-def _role_choices_set() -> set[str]:
+@lru_cache(maxsize=None)
+def _role_choices_set() -> frozenset[str]:
     try:
-        return {str(k) for (k, _label) in MemberProfile._meta.get_field("role").choices}
+        return frozenset(str(k) for (k, _label) in MemberProfile._meta.get_field("role").choices)
     except Exception:
-        return set()
+        return frozenset()
 
 
-def _committee_required_roles() -> set[str]:
+@lru_cache(maxsize=None)
+def _committee_required_roles() -> frozenset[str]:
     """
     إذا عندك ثابت MemberProfile.COMMITTEE_ROLES نستخدمه.
     غير ذلك: نفترض الشائع chair/member (وغيرها إن كانت موجودة في choices).
     """
     if hasattr(MemberProfile, "COMMITTEE_ROLES"):
         try:
-            return set(getattr(MemberProfile, "COMMITTEE_ROLES"))
+            return frozenset(getattr(MemberProfile, "COMMITTEE_ROLES"))
         except Exception:
             pass
 
     common = {"chair", "member", "committee_member", "committee_chair"}
     choices = _role_choices_set()
-    return (common & choices) if choices else common
+    return frozenset(common & choices) if choices else frozenset(common)
 
 
+@lru_cache(maxsize=None)
 def _get_opportunity_model_and_keyfield() -> tuple[type, str]:
     """
     يستخرج موديل الفرصة من FK الموجود داخل Committee.opportunity
@@ -145,16 +148,7 @@ def _get_opportunity_model_and_keyfield() -> tuple[type, str]:
     )
 
 
-def _create_or_get_opportunity(opp_model: type, key_field: str, opp_value: str):
-    """
-    get_or_create على موديل الفرصة باستخدام الحقل النصي المناسب
-    """
-    if not opp_value:
-        raise CommandError("قيمة opportunity فارغة ولا يمكن إنشاء/جلب فرصة.")
-    kwargs = {key_field: opp_value}
-    return opp_model.objects.get_or_create(**kwargs)
-
-
+@lru_cache(maxsize=None)
 def _mp_opportunity_is_fk() -> bool:
     if not _has_field(MemberProfile, "opportunity"):
         return False
@@ -162,6 +156,37 @@ def _mp_opportunity_is_fk() -> bool:
     return bool(getattr(f, "is_relation", False))
 
 
+BATCH_SIZE = 1000
+
+# ملفات أصغر من هذا الحجم تُقرأ كاملة إلى الذاكرة (BytesIO) بدل القراءة من القرص
+IN_MEMORY_MAX_BYTES = 50 * 1024 * 1024
+
+# بعد هذا العدد من الصفوف المتتالية بدون سجل مدني نعتبر البيانات انتهت
+# (ملفات Excel كثيرًا ما تحمل آلاف الصفوف المنسّقة الفارغة بعد آخر صف فعلي)
+MAX_EMPTY_ROWS = 50
+
+
+# ======================================================
+# Columns (Arabic/English)
+# ======================================================
+COLUMN_ALIASES: dict[str, tuple[str, ...]] = {
+    "national_id": ("national_id", "nid", "identity", "id", "السجل", "السجل_المدني", "الهوية", "رقم_الهوية"),
+    "full_name": ("full_name", "name", "الاسم", "الاسم_كامل", "الاسم_الكامل"),
+    "role": ("role", "الدور", "الصفة", "صلاحية", "المسمى"),
+    "is_active": ("active", "is_active", "enabled", "تفعيل", "فعال", "نشط", "مفعل"),
+    "opportunity": ("opportunity", "opp", "الفرصة", "فرصة"),
+    "committee": ("committee", "committee_name", "اللجنة", "لجنة"),
+}
+
+# ترتيب أعمدة الصف كما يستهلكها Command.handle
+ROW_FIELDS = ("national_id", "full_name", "role", "is_active", "opportunity", "committee")
+
+# نفس الأسماء بعد _norm (تُحسب مرة واحدة عند تحميل الموديول)
+COLUMN_KEYS: dict[str, tuple[str, ...]] = {
+    field: tuple(_norm(n) for n in names) for field, names in COLUMN_ALIASES.items()
+}
+
+
 # ======================================================
 # Data
 # ======================================================
@@ -175,6 +200,83 @@ class RowData:
     committee_name: str
 
 
+
+def _iter_rows(
+    rows_iter: Iterator[tuple],
+    col_idx: tuple[Optional[int], ...],
+    first_row: int,
+    on_cutoff: Optional[Callable[[int], None]] = None,
+) -> Iterator[RowData]:
+    """
+    يحوّل صفوف الورقة (بعد صف العناوين) إلى RowData صفًا بصف بدون تجميعها في قائمة.
+    الصفوف بدون سجل مدني تُتجاهل، وأي صف غير صالح (دور/لجنة/فرصة) يوقف الاستيراد (CommandError).
+    on_cutoff(رقم الصف): يُستدعى إذا توقفت القراءة بسبب MAX_EMPTY_ROWS قبل نهاية الورقة.
+    """
+    committee_required_roles = _committee_required_roles()
+    valid_roles = _role_choices_set()
+
+    # fallback role (لا نخمن roles جديدة؛ نستخدم أول choice إن لم يوجد)
+    default_role = next(iter(valid_roles)) if valid_roles else "member"
+
+    # أسماء محلية داخل الحلقة (LOAD_FAST بدل LOAD_GLOBAL لكل خلية)
+    digits_only, true_values = _digits_only, _TRUE
+
+    empty_streak = 0
+    for r, row in enumerate(rows_iter, start=first_row):
+        width = len(row)
+        nid_v, name_v, role_v, active_v, opp_v, com_v = (
+            row[c] if c is not None and c < width else None for c in col_idx
+        )
+
+        nid = digits_only(nid_v)
+        if not nid:
+            empty_streak += 1
+            if empty_streak > MAX_EMPTY_ROWS:
+                if on_cutoff is not None:
+                    on_cutoff(r)
+                break
+            continue
+        empty_streak = 0
+
+        # نفس _s مكتوبة inline (بدون استدعاء دالة لكل خلية)
+        full_name = "" if name_v is None else str(name_v).strip()
+        role = ("" if role_v is None else str(role_v).strip()) or default_role
+        opportunity = "" if opp_v is None else str(opp_v).strip()
+        committee_name = "" if com_v is None else str(com_v).strip()
+
+        # True/False من Excel كما هي؛ غير ذلك نص ضمن _TRUE (1 و "نعم" ...)
+        if active_v is True or active_v is False:
+            is_active = active_v
+        else:
+            is_active = active_v is not None and str(active_v).strip().lower() in true_values
+
+        if valid_roles and role not in valid_roles:
+            raise CommandError(f"Row {r}: role='{role}' غير موجود ضمن choices في MemberProfile.role")
+
+        # إذا دور لجنة لازم تكون اللجنة موجودة + أي لجنة لازم لها opportunity لأن Committee يتطلبه
+        if role in committee_required_roles and not committee_name:
+            raise CommandError(f"Row {r}: role='{role}' يتطلب لجنة (committee) لكن العمود فارغ.")
+        if committee_name and not opportunity:
+            raise CommandError(
+                f"Row {r}: committee='{committee_name}' تتطلب opportunity لكن عمود opportunity/الفرصة فارغ."
+            )
+
+        yield RowData(
+            national_id=nid,
+            full_name=full_name,
+            role=role,
+            is_active=is_active,
+            opportunity=opportunity,
+            committee_name=committee_name,
+        )
+
+
+def _chunks(it: Iterator[Any], size: int) -> Iterator[list[Any]]:
+    """دفعات بحجم size من iterator (الذاكرة بحجم دفعة واحدة)"""
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
 # ======================================================
 # Command
 # ======================================================
@@ -184,33 +286,57 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("xlsx_path", type=str, help="Path to .xlsx file")
         parser.add_argument("--dry-run", action="store_true", help="Do not write to DB")
+        parser.add_argument(
+            "--single-transaction",
+            action="store_true",
+            help="Import the whole file in one transaction (default: one transaction per batch)",
+        )
 
     def handle(self, *args, **options):
         path: str = options["xlsx_path"]
         dry: bool = bool(options["dry_run"])
 
+        # read_only: قراءة متدفقة (الذاكرة بحجم صف واحد بدل الملف كاملًا)
+        # الملف الصغير يُقرأ مرة واحدة إلى الذاكرة: الـ zip يُفتح ويُقرأ مرتين (تحقق ثم كتابة)
+        # بدون الرجوع للقرص؛ الملفات الكبيرة تبقى على القرص حفاظًا على الذاكرة
         try:
-            wb = load_workbook(filename=path, data_only=True)
+            src = Path(path)
+            if src.stat().st_size < IN_MEMORY_MAX_BYTES:
+                src = BytesIO(src.read_bytes())
+            wb = load_workbook(filename=src, data_only=True, read_only=True)
         except Exception as e:
             raise CommandError(f"تعذر فتح الملف: {path}\n{e}")
 
+        # الملف يبقى مفتوحًا طوال الاستيراد: الصفوف تُقرأ دفعة دفعة أثناء الكتابة
+        try:
+            self._import(
+                wb,
+                path,
+                dry,
+                int(options.get("verbosity", 1)) >= 2,
+                bool(options["single_transaction"]),
+            )
+        finally:
+            wb.close()
+
+    def _import(self, wb, path: str, dry: bool, verbose: bool, single_transaction: bool) -> None:
         ws = wb.active
-        header_map = _get_header_map(ws)
+        # بعض الملفات تحمل أبعادًا (dimensions) خاطئة؛ نتجاهلها ونقرأ حتى آخر صف فعلي
+        ws.reset_dimensions()
+        rows_iter = ws.iter_rows(values_only=True)
+
+        header_map = _get_header_map(rows_iter)
         header_row = int(header_map["__header_row__"])
 
         # Columns (Arabic/English)
-        c_nid = _col(header_map, ["national_id", "nid", "identity", "id", "السجل", "السجل_المدني", "الهوية", "رقم_الهوية"])
-        c_name = _col(header_map, ["full_name", "name", "الاسم", "الاسم_كامل", "الاسم_الكامل"])
-        c_role = _col(header_map, ["role", "الدور", "الصفة", "صلاحية", "المسمى"])
-        c_active = _col(header_map, ["active", "is_active", "enabled", "تفعيل", "فعال", "نشط", "مفعل"])
-        c_opp = _col(header_map, ["opportunity", "opp", "الفرصة", "فرصة"])
-        c_committee = _col(header_map, ["committee", "committee_name", "اللجنة", "لجنة", "committee"])
-
-        if not c_nid:
-            raise CommandError("لا يوجد عمود للسجل/الهوية. تأكد من وجود عمود مثل: السجل المدني / national_id")
+        # مواقع الأعمدة (0-based) بترتيب ROW_FIELDS — تُحسب مرة واحدة لكل ملف
+        col_idx = tuple(
+            (c - 1) if c else None
+            for c in (_col(header_map, COLUMN_KEYS[f]) for f in ROW_FIELDS)
+        )
 
-        committee_required_roles = _committee_required_roles()
-        valid_roles = _role_choices_set()
+        if col_idx[0] is None:
+            raise CommandError("لا يوجد عمود للسجل/الهوية. تأكد من وجود عمود مثل: السجل المدني / national_id")
 
         # Opportunity model inferred from Committee.opportunity FK
         opp_model, opp_key_field = _get_opportunity_model_and_keyfield()
@@ -221,57 +347,39 @@ class Command(BaseCommand):
         if dry:
             self.stdout.write(self.style.WARNING("DRY RUN: لن يتم حفظ أي شيء في قاعدة البيانات (Dry-run حقيقي)."))
 
+        # MemberProfile schema (ثابت طوال التشغيل) — يُحسب مرة واحدة قبل أي حلقة
+        mp_has_opp = _has_field(MemberProfile, "opportunity")
         mp_opp_fk = _mp_opportunity_is_fk()
-
-        # Collect rows
-        rows: list[RowData] = []
-        for r in range(header_row + 1, ws.max_row + 1):
-            nid = _digits_only(_get_cell(ws, r, c_nid))
-            if not nid:
-                continue
-
-            full_name = _s(_get_cell(ws, r, c_name))
-            role = _s(_get_cell(ws, r, c_role))
-
-            # fallback role (لا نخمن roles جديدة؛ نستخدم أول choice إن لم يوجد)
-            if not role:
-                if valid_roles:
-                    role = next(iter(valid_roles))
-                else:
-                    role = "member"
-
-            is_active = _bool(_get_cell(ws, r, c_active))
-            opportunity = _s(_get_cell(ws, r, c_opp))
-            committee_name = _s(_get_cell(ws, r, c_committee))
-
-            if valid_roles and role not in valid_roles:
-                raise CommandError(f"Row {r}: role='{role}' غير موجود ضمن choices في MemberProfile.role")
-
-            # إذا دور لجنة لازم تكون اللجنة موجودة + لازم يكون opportunity موجود لأن Committee يتطلبه
-            if role in committee_required_roles:
-                if not committee_name:
-                    raise CommandError(f"Row {r}: role='{role}' يتطلب لجنة (committee) لكن العمود فارغ.")
-                if not opportunity:
-                    raise CommandError(
-                        f"Row {r}: committee='{committee_name}' تتطلب opportunity لكن عمود opportunity/الفرصة فارغ."
-                    )
-
-            rows.append(
-                RowData(
-                    national_id=nid,
-                    full_name=full_name,
-                    role=role,
-                    is_active=is_active,
-                    opportunity=opportunity,
-                    committee_name=committee_name,
-                )
+        mp_has_full_name = _has_field(MemberProfile, "full_name")
+
+        profile_fields = ["role", "committee", "is_active"]
+        if mp_has_opp:
+            profile_fields.append("opportunity")
+        if mp_has_full_name:
+            profile_fields.append("full_name")
+
+        def warn_cutoff(r: int) -> None:
+            # أي بيانات بعد هذا الصف لم تُقرأ: يجب أن يعرف المستخدم بدل توقف صامت
+            self.stdout.write(self.style.WARNING(
+                f"توقفت القراءة عند الصف {r}: أكثر من {MAX_EMPTY_ROWS} صفًا متتاليًا بدون سجل مدني "
+                f"(الصفوف {r - MAX_EMPTY_ROWS}-{r}). أي بيانات بعد ذلك لم تُستورد."
+            ))
+
+        # مولّد: لا قائمة rows في الذاكرة
+        # التحذير من القراءة الأولى فقط (dry-run أو التحقق المسبق) حتى لا يتكرر
+        rows = _iter_rows(rows_iter, col_idx, header_row + 1, on_cutoff=warn_cutoff)
+
+        # تفاصيل كل صف تظهر فقط مع -v 2 (الكتابة لكل صف مكلفة في الملفات الكبيرة)
+        log_buf: list[str] = []
+
+        def row_line(i: int, rd: RowData) -> str:
+            return (
+                f"Row {i}: {rd.national_id} role={rd.role} active={rd.is_active} "
+                f"opp={rd.opportunity or '-'} com={rd.committee_name or '-'}"
             )
 
-        if not rows:
-            self.stdout.write(self.style.WARNING("لا توجد صفوف صالحة للاستيراد."))
-            return
-
         # Counters
+        total_rows = 0
         created_users = 0
         existing_users = 0
         created_profiles = 0
@@ -279,123 +387,186 @@ class Command(BaseCommand):
         created_committees = 0
         created_opps = 0
 
-        # ✅ افصل signal أثناء الاستيراد الحقيقي (حتى لا ينشئ profile مخالف للقيود)
-        disconnected = False
-        if not dry:
-            try:
-                post_save.disconnect(ensure_profile, sender=User)
-                disconnected = True
-            except Exception:
-                disconnected = False
-
-        try:
-            if dry:
-                # ======================================================
-                # DRY RUN (NO DB)
-                # ======================================================
-                for i, rd in enumerate(rows, start=1):
-                    if rd.opportunity:
-                        self.stdout.write(f"[DRY] Would get_or_create {opp_model.__name__}({opp_key_field}='{rd.opportunity}')")
-
-                    if rd.committee_name:
-                        if not rd.opportunity:
-                            raise CommandError(f"Row {i}: committee='{rd.committee_name}' يتطلب opportunity لكن قيمته فارغة.")
-                        self.stdout.write(f"[DRY] Would get_or_create Committee(name='{rd.committee_name}', opportunity='{rd.opportunity}')")
-
-                    self.stdout.write(f"[DRY] Would get_or_create User(username={rd.national_id})")
-                    self.stdout.write(
-                        f"[DRY] Would update_or_create MemberProfile(user={rd.national_id}, "
-                        f"role={rd.role}, active={rd.is_active}, committee={rd.committee_name or '-'}, "
-                        f"opportunity={'FK instance' if mp_opp_fk else (rd.opportunity or '-')})"
-                    )
-                    self.stdout.write(
-                        f"Row {i}: {rd.national_id} role={rd.role} active={rd.is_active} "
-                        f"opp={rd.opportunity or '-'} com={rd.committee_name or '-'}"
-                    )
+        if dry:
+            # ======================================================
+            # DRY RUN (NO DB)
+            # ======================================================
+            for i, rd in enumerate(rows, start=1):
+                total_rows = i
+                if not verbose:
+                    continue
+
+                if rd.opportunity:
+                    log_buf.append(f"[DRY] Would get_or_create {opp_model.__name__}({opp_key_field}='{rd.opportunity}')")
+                if rd.committee_name:
+                    log_buf.append(f"[DRY] Would get_or_create Committee(name='{rd.committee_name}', opportunity='{rd.opportunity}')")
+                log_buf.append(f"[DRY] Would get_or_create User(username={rd.national_id})")
+                log_buf.append(
+                    f"[DRY] Would update_or_create MemberProfile(user={rd.national_id}, "
+                    f"role={rd.role}, active={rd.is_active}, committee={rd.committee_name or '-'}, "
+                    f"opportunity={'FK instance' if mp_opp_fk else (rd.opportunity or '-')})"
+                )
+                log_buf.append(row_line(i, rd))
 
-                self.stdout.write(self.style.SUCCESS("DRY RUN Done ✅ (no database writes)"))
+            if not total_rows:
+                self.stdout.write(self.style.WARNING("لا توجد صفوف صالحة للاستيراد."))
                 return
 
-            # ======================================================
-            # REAL RUN (DB writes)
-            # ======================================================
-            with transaction.atomic():
-                for i, rd in enumerate(rows, start=1):
-                    # Opportunity instance (if provided)
-                    opp_obj = None
-                    if rd.opportunity:
-                        opp_obj, opp_created = _create_or_get_opportunity(opp_model, opp_key_field, rd.opportunity)
-                        if opp_created:
-                            created_opps += 1
-
-                    # Committee (requires opportunity instance)
-                    committee_obj = None
-                    if rd.committee_name:
-                        if not opp_obj:
-                            raise CommandError(
-                                f"Row {i}: committee='{rd.committee_name}' يتطلب opportunity لكن لم يتم تحديدها."
+            if log_buf:
+                self.stdout.write("\n".join(log_buf))
+            self.stdout.write(self.style.SUCCESS("DRY RUN Done ✅ (no database writes)"))
+            return
+
+        # ======================================================
+        # REAL RUN (DB writes) — دفعات بحجم BATCH_SIZE
+        # ======================================================
+        # تحقق كامل قبل أي كتابة (قراءة بدون DB): أخطاء الملف لا تظهر في منتصف الاستيراد
+        # ولا تترك دفعات محفوظة جزئيًا
+        if not sum(1 for _ in rows):
+            self.stdout.write(self.style.WARNING("لا توجد صفوف صالحة للاستيراد."))
+            return
+
+        # قراءة ثانية من أول صف بيانات — كل الصفوف صالحة هنا
+        rows = _iter_rows(ws.iter_rows(min_row=header_row + 1, values_only=True), col_idx, header_row + 1)
+
+        # الفرص واللجان تتكرر بين الدفعات: نحتفظ بما جُلب/أُنشئ ولا نستعلم عنه مجددًا
+        # (المفاتيح فقط عبر values_list — الربط يتم بـ *_id بدون كائنات كاملة)
+        opp_lookup = f"{opp_key_field}__in"
+        opps: dict[str, int] = {}
+        committees: dict[tuple[int, str], int] = {}
+
+        def fetch_opps(names) -> dict[str, int]:
+            return {
+                name: pk
+                for pk, name in opp_model.objects.filter(**{opp_lookup: names}).values_list("pk", opp_key_field)
+            }
+
+        def fetch_committees(keys: set[tuple[int, str]]) -> dict[tuple[int, str], int]:
+            qs = Committee.objects.filter(
+                opportunity_id__in={k[0] for k in keys},
+                name__in={k[1] for k in keys},
+            ).values_list("opportunity_id", "name", "pk")
+            return {(opp_id, name): pk for opp_id, name, pk in qs if (opp_id, name) in keys}
+
+        # bulk_create لا يرسل post_save: ensure_profile لا يعمل هنا ولا حاجة لفصله مؤقتًا
+        # كل دفعة في transaction مستقلة: الأقفال وحجم الـ journal بحجم دفعة لا بحجم الملف
+        # (--single-transaction: كل شيء أو لا شيء حتى مع أخطاء قاعدة البيانات)
+        with transaction.atomic() if single_transaction else nullcontext():
+            for chunk in _chunks(rows, BATCH_SIZE):
+                start = total_rows + 1
+
+                with transaction.atomic():
+                    # ---- Opportunities: جلب الموجود دفعة واحدة + إنشاء الناقص bulk ----
+                    opp_names = {rd.opportunity for rd in chunk if rd.opportunity} - opps.keys()
+                    if opp_names:
+                        opps.update(fetch_opps(opp_names))
+                        missing_opps = sorted(opp_names - opps.keys())
+                        if missing_opps:
+                            opp_model.objects.bulk_create(
+                                [opp_model(**{opp_key_field: n}) for n in missing_opps],
+                                batch_size=BATCH_SIZE,
+                                ignore_conflicts=True,
+                            )
+                            opps.update(fetch_opps(missing_opps))
+                            created_opps += len(missing_opps)
+
+                    # ---- Committees: مفتاحها (opportunity_id, name) ----
+                    com_keys: set[tuple[int, str]] = set()
+                    for rd in chunk:
+                        if rd.committee_name:
+                            com_keys.add((opps[rd.opportunity], rd.committee_name))
+                    com_keys -= committees.keys()
+
+                    if com_keys:
+                        committees.update(fetch_committees(com_keys))
+                        missing_coms = com_keys - committees.keys()
+                        if missing_coms:
+                            Committee.objects.bulk_create(
+                                [Committee(opportunity_id=opp_id, name=name) for opp_id, name in sorted(missing_coms)],
+                                batch_size=BATCH_SIZE,
+                                ignore_conflicts=True,
                             )
-                        committee_obj, com_created = Committee.objects.get_or_create(
-                            name=rd.committee_name,
-                            opportunity=opp_obj,
-                        )
-                        if com_created:
-                            created_committees += 1
-
-                    # User
-                    u, u_created = User.objects.get_or_create(username=rd.national_id)
-                    if u_created:
-                        created_users += 1
-                        if hasattr(u, "set_unusable_password"):
-                            u.set_unusable_password()
-                    else:
-                        existing_users += 1
-
-                    if rd.full_name:
-                        u.first_name = rd.full_name[:30]
-                    u.save()
-
-                    # Profile
-                    defaults: dict[str, Any] = {
-                        "role": rd.role,
-                        "committee": committee_obj,
-                        "is_active": rd.is_active,
+                            committees.update(fetch_committees(missing_coms))
+                            created_committees += len(missing_coms)
+
+                    # ---- Users: username = السجل المدني ----
+                    # نفس السجل مكرر في الدفعة؟ آخر صف هو المعتمد (كما في الحفظ صفًا بصف)
+                    last_row = {rd.national_id: rd for rd in chunk}
+                    users = User.objects.in_bulk(list(last_row), field_name="username")
+
+                    # make_password(None): كلمة مرور غير صالحة للدخول ("!" + نص عشوائي) ضمن نفس الـ INSERT
+                    new_users = []
+                    for nid, rd in last_row.items():
+                        if nid in users:
+                            continue
+                        new_users.append(User(username=nid, first_name=rd.full_name[:30], password=make_password(None)))
+                    User.objects.bulk_create(new_users, batch_size=BATCH_SIZE)
+                    created_users += len(new_users)
+
+                    # UPDATE فقط لمن تغيّر اسمه فعلًا
+                    touched_users = []
+                    for nid, u in users.items():
+                        first_name = last_row[nid].full_name[:30]
+                        if first_name and u.first_name != first_name:
+                            u.first_name = first_name
+                            touched_users.append(u)
+                    User.objects.bulk_update(touched_users, ["first_name"], batch_size=BATCH_SIZE)
+                    existing_users += len(users)
+
+                    users.update({u.username: u for u in new_users})
+
+                    # ---- Profiles: مفتاحها user_id ----
+                    profiles = {
+                        p.user_id: p
+                        for p in MemberProfile.objects.filter(user_id__in=[u.pk for u in users.values()])
                     }
 
-                    # opportunity in MemberProfile: FK -> instance, else -> string
-                    if _has_field(MemberProfile, "opportunity"):
-                        mp_f = MemberProfile._meta.get_field("opportunity")
-                        if getattr(mp_f, "is_relation", False):
-                            defaults["opportunity"] = opp_obj
-                        else:
-                            defaults["opportunity"] = rd.opportunity
-
-                    if _has_field(MemberProfile, "full_name") and rd.full_name:
-                        defaults["full_name"] = rd.full_name
-
-                    prof, p_created = MemberProfile.objects.update_or_create(user=u, defaults=defaults)
-                    if p_created:
-                        created_profiles += 1
-                    else:
-                        updated_profiles += 1
-
-                    self.stdout.write(
-                        f"Row {i}: {rd.national_id} role={rd.role} active={rd.is_active} "
-                        f"opp={rd.opportunity or '-'} com={rd.committee_name or '-'}"
+                    new_profiles = []
+                    for nid, rd in last_row.items():
+                        u = users[nid]
+                        opp_id = opps.get(rd.opportunity) if rd.opportunity else None
+                        committee_id = committees[(opp_id, rd.committee_name)] if rd.committee_name else None
+
+                        prof = profiles.get(u.pk)
+                        if prof is None:
+                            prof = MemberProfile(user=u)
+                            new_profiles.append(prof)
+
+                        prof.role = rd.role
+                        prof.committee_id = committee_id
+                        prof.is_active = rd.is_active
+
+                        # opportunity in MemberProfile: FK -> id, else -> string
+                        if mp_has_opp:
+                            if mp_opp_fk:
+                                prof.opportunity_id = opp_id
+                            else:
+                                prof.opportunity = rd.opportunity
+
+                        if mp_has_full_name and rd.full_name:
+                            prof.full_name = rd.full_name
+
+                    MemberProfile.objects.bulk_create(new_profiles, batch_size=BATCH_SIZE)
+                    MemberProfile.objects.bulk_update(
+                        [p for p in profiles.values()],
+                        profile_fields,
+                        batch_size=BATCH_SIZE,
                     )
+                    created_profiles += len(new_profiles)
+                    updated_profiles += len(profiles)
 
-        finally:
-            if not dry and disconnected:
-                try:
-                    post_save.connect(ensure_profile, sender=User)
-                except Exception:
-                    pass
+                total_rows += len(chunk)
+                if verbose:
+                    log_buf.extend(row_line(i, rd) for i, rd in enumerate(chunk, start=start))
+
+        # سطر لكل صف فقط مع -v 2، ويُكتب دفعة واحدة بعد انتهاء الكتابة
+        if log_buf:
+            self.stdout.write("\n".join(log_buf))
 
         self.stdout.write(self.style.SUCCESS("Done ✅"))
         self.stdout.write(
             f"Opportunities created: {created_opps}\n"
             f"Committees created: {created_committees}\n"
             f"Users created: {created_users} | existing users touched: {existing_users}\n"
-            f"Profiles created: {created_profiles} | profiles updated: {updated_profiles}\n"
-            f"Signal disconnected during import: {disconnected}"
+            f"Profiles created: {created_profiles} | profiles updated: {updated_profiles}"
         )
@@ -0,0 +1,33 @@
+# candidates/management/digits.py
+from __future__ import annotations
+
+import unicodedata
+
+
+class DigitsTable(dict):
+    """
+    جدول str.translate يحذف كل محرف ليس رقمًا عشريًا (str.isdecimal).
+    - normalize=False: تبقى الأرقام كما هي (٠١٢ تبقى ٠١٢).
+    - normalize=True: تُحوَّل إلى 0-9 اللاتينية (٠١٢ / ۰۱۲ / ０１２ → 012).
+    يُبنى تدريجيًا: كل محرف يُفحص مرة واحدة ثم يُخزَّن.
+    """
+
+    def __init__(self, normalize: bool = False):
+        super().__init__()
+        self.normalize = normalize
+
+    def __missing__(self, code: int):
+        ch = chr(code)
+        if not ch.isdecimal():
+            keep = None
+        elif self.normalize:
+            keep = str(unicodedata.decimal(ch))
+        else:
+            keep = code
+        self[code] = keep
+        return keep
+
+
+# جداول مشتركة بين أوامر الاستيراد
+DIGITS_ONLY = DigitsTable()
+DIGITS_ONLY_ASCII = DigitsTable(normalize=True)
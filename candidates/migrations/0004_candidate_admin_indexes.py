@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-15 04:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0003_memberprofile_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['opportunity', 'full_name'], name='candidates__opportu_ba184e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['sector'], name='candidates__sector_4cf370_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['is_finalized', 'file_not_eligible'], name='candidates__is_fina_918651_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-15 04:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0004_candidate_admin_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='memberprofile',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['national_id', 'mobile_last4'], name='mp_login_active_idx'),
+        ),
+    ]
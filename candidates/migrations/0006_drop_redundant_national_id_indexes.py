@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-15 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0005_memberprofile_login_active_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='candidate',
+            name='candidates__opportu_c349e4_idx',
+        ),
+        migrations.AlterField(
+            model_name='candidate',
+            name='national_id',
+            field=models.CharField(max_length=20, verbose_name='السجل المدني'),
+        ),
+        migrations.AlterField(
+            model_name='memberprofile',
+            name='national_id',
+            field=models.CharField(max_length=20, verbose_name='السجل المدني'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-15 04:40
+
+from decimal import ROUND_HALF_UP, Decimal
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def score_to_x100(apps, schema_editor):
+    InterviewScore = apps.get_model("candidates", "InterviewScore")
+    rows = list(InterviewScore.objects.only("pk", "score"))
+    for row in rows:
+        row.score_x100 = int((Decimal(row.score) * 100).to_integral_value(ROUND_HALF_UP))
+    InterviewScore.objects.bulk_update(rows, ["score_x100"], batch_size=500)
+
+
+def x100_to_score(apps, schema_editor):
+    InterviewScore = apps.get_model("candidates", "InterviewScore")
+    rows = list(InterviewScore.objects.only("pk", "score_x100"))
+    for row in rows:
+        row.score = Decimal(row.score_x100).scaleb(-2)
+    InterviewScore.objects.bulk_update(rows, ["score"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0006_drop_redundant_national_id_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewscore',
+            name='score_x100',
+            field=models.PositiveSmallIntegerField(null=True, verbose_name='درجة المقابلة ×100 (0-5000)'),
+        ),
+        migrations.AlterField(
+            model_name='interviewscore',
+            name='score',
+            field=models.DecimalField(decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(50)], verbose_name='درجة المقابلة (0-50)'),
+        ),
+        migrations.RunPython(score_to_x100, x100_to_score),
+        migrations.AlterField(
+            model_name='interviewscore',
+            name='score_x100',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MaxValueValidator(5000)], verbose_name='درجة المقابلة ×100 (0-5000)'),
+        ),
+        migrations.RemoveField(
+            model_name='interviewscore',
+            name='score',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-15 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0007_interviewscore_score_x100'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['assigned_committee', 'full_name'], name='candidates__assigne_b36345_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(condition=models.Q(('file_not_eligible', False), ('file_score__isnull', True)), fields=['opportunity', 'full_name'], name='cand_pending_file_idx'),
+        ),
+    ]
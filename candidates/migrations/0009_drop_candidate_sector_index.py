@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-15 05:01
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0008_candidate_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='candidate',
+            name='candidates__sector_4cf370_idx',
+        ),
+    ]
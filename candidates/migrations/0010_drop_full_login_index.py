@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-15 05:03
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0009_drop_candidate_sector_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='memberprofile',
+            name='candidates__nationa_be9403_idx',
+        ),
+    ]
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models import Q
 
+# تقريب الدرجات المحسوبة (خانتان)
+CENT = Decimal("0.01")
+
 
 # ==========================================================
 # Core
@@ -27,6 +30,15 @@ class Opportunity(models.Model):
     def __str__(self) -> str:
         return self.name
 
+    @classmethod
+    def get_active(cls) -> "Opportunity | None":
+        """
+        أول فرصة فعّالة.
+        بدون كاش عمدًا: الكاش الافتراضي (LocMem) لكل عملية، وتفعيل الفرصة قد يحدث من عملية أخرى
+        (أوامر الاستيراد / عامل آخر)، وتوزيع المرشحين يعتمد على هذه القيمة.
+        """
+        return cls.objects.filter(is_active=True).first()
+
 
 class Committee(models.Model):
     """
@@ -80,7 +92,8 @@ class MemberProfile(models.Model):
         verbose_name="المستخدم",
     )
 
-    national_id = models.CharField("السجل المدني", max_length=20, db_index=True)
+    # بدون index مستقل: استعلام الدخول يستخدم mp_login_active_idx (national_id كعمود أول)
+    national_id = models.CharField("السجل المدني", max_length=20)
     mobile_last4 = models.CharField("آخر 4 من الجوال", max_length=4)
 
     role = models.CharField("الدور", max_length=20, choices=ROLE_CHOICES)
@@ -111,7 +124,13 @@ class MemberProfile(models.Model):
         verbose_name = "ملف مستخدم"
         verbose_name_plural = "ملفات المستخدمين"
         indexes = [
-            models.Index(fields=["national_id", "mobile_last4"]),
+            # استعلام الدخول (الوحيد على هذين العمودين) يفلتر دائمًا is_active=True:
+            # index جزئي للحسابات المفعّلة فقط بدل index كامل مكرر
+            models.Index(
+                fields=["national_id", "mobile_last4"],
+                condition=Q(is_active=True),
+                name="mp_login_active_idx",
+            ),
             models.Index(fields=["role"]),
         ]
         constraints = [
@@ -155,7 +174,8 @@ class Candidate(models.Model):
     )
 
     full_name = models.CharField("اسم المتقدم", max_length=200)
-    national_id = models.CharField("السجل المدني", max_length=20, db_index=True)
+    # بدون index مستقل: يغطيه unique_together (opportunity, national_id)
+    national_id = models.CharField("السجل المدني", max_length=20)
     mobile = models.CharField("رقم الجوال", max_length=20, blank=True, default="")
 
     # ---- Excel fields ----
@@ -221,31 +241,51 @@ class Candidate(models.Model):
         verbose_name = "مرشح"
         verbose_name_plural = "المرشحون"
         unique_together = [("opportunity", "national_id")]
+        # (opportunity, national_id) مغطى بالـ unique index أعلاه؛ لا حاجة لنسخة ثانية
         indexes = [
-            models.Index(fields=["opportunity", "national_id"]),
             models.Index(fields=["opportunity", "assigned_committee"]),
             models.Index(fields=["opportunity", "is_finalized"]),
+            # ترتيب/فلاتر لوحة الإدارة (Django admin)
+            models.Index(fields=["opportunity", "full_name"]),
+            models.Index(fields=["is_finalized", "file_not_eligible"]),
+            # لوحة اللجنة: مرشحو اللجنة مرتبين بالاسم
+            models.Index(fields=["assigned_committee", "full_name"]),
+            # قائمة "بانتظار تقييم الملف" لدى المشرف (الفلتر الأكثر تكرارًا) — index جزئي لغير المقيّمين فقط
+            models.Index(
+                fields=["opportunity", "full_name"],
+                condition=Q(file_score__isnull=True, file_not_eligible=False),
+                name="cand_pending_file_idx",
+            ),
         ]
 
     def __str__(self) -> str:
         return f"{self.full_name} ({self.national_id})"
 
     def interview_scores_for_committee(self, committee: Committee):
-        return self.interview_scores.filter(committee=committee).values_list("score", flat=True)
+        """درجات اللجنة بالأعداد الصحيحة المخزنة (score_x100)"""
+        return self.interview_scores.filter(committee=committee).values_list("score_x100", flat=True)
+
+    def interview_and_final(self, n: int, sum_x100: int) -> tuple[Decimal, Decimal]:
+        """
+        (متوسط المقابلة، المجموع النهائي) من عدد ومجموع درجات اللجنة (score_x100).
+        - المتوسط 0 ما لم تكتمل 3 درجات بالضبط.
+        - المجموع 0 إن كان الملف "لا يرشح" أو بلا درجة ملف.
+        Decimal مقرّب لخانتين (نفس دقة FinalDecision.final_score_value).
+        """
+        avg = Decimal(sum_x100) / 300 if n == 3 else Decimal(0)
+        if self.file_not_eligible or self.file_score is None:
+            total = Decimal(0)
+        else:
+            total = self.file_score + avg
+        return avg.quantize(CENT, ROUND_HALF_UP), total.quantize(CENT, ROUND_HALF_UP)
+
+    def interview_avg(self, committee: Committee) -> Decimal:
+        scores = list(self.interview_scores_for_committee(committee))
+        return self.interview_and_final(len(scores), sum(scores))[0]
 
-    def interview_avg(self, committee: Committee) -> float:
+    def final_score(self, committee: Committee) -> Decimal:
         scores = list(self.interview_scores_for_committee(committee))
-        if len(scores) != 3:
-            return 0.0
-        total = sum(Decimal(s) for s in scores)
-        return float(total / Decimal("3"))
-
-    def final_score(self, committee: Committee) -> float:
-        if self.file_not_eligible:
-            return 0.0
-        if self.file_score is None:
-            return 0.0
-        return float(Decimal(self.file_score) + Decimal(str(self.interview_avg(committee))))
+        return self.interview_and_final(len(scores), sum(scores))[1]
 
     @property
     def is_ready_for_distribution(self) -> bool:
@@ -277,11 +317,10 @@ class InterviewScore(models.Model):
         related_name="interview_scores",
     )
 
-    score = models.DecimalField(
-        "درجة المقابلة (0-50)",
-        max_digits=5,
-        decimal_places=2,
-        validators=[MinValueValidator(0), MaxValueValidator(50)],
+    # الدرجة (0-50 بخانتين عشريتين) مخزنة كعدد صحيح ×100 (0-5000)؛ استخدم score للقراءة/الكتابة
+    score_x100 = models.PositiveSmallIntegerField(
+        "درجة المقابلة ×100 (0-5000)",
+        validators=[MaxValueValidator(5000)],
     )
     notes = models.TextField("ملاحظات", blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -298,6 +337,19 @@ class InterviewScore(models.Model):
     def __str__(self) -> str:
         return f"{self.candidate} | {self.member} | {self.score}"
 
+    @property
+    def score(self) -> Decimal | None:
+        if self.score_x100 is None:
+            return None
+        return Decimal(self.score_x100).scaleb(-2)
+
+    @score.setter
+    def score(self, value) -> None:
+        if value is None:
+            self.score_x100 = None
+            return
+        self.score_x100 = int((Decimal(str(value)) * 100).to_integral_value(ROUND_HALF_UP))
+
 
 # ==========================================================
 # Final Decision
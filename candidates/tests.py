@@ -1,3 +1,442 @@
-from django.test import TestCase
+from __future__ import annotations
 
-# Create your tests here.
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from openpyxl import Workbook
+
+from candidates.management.commands import import_users_roles
+from candidates.models import Candidate, Committee, InterviewScore, MemberProfile, Opportunity
+
+User = get_user_model()
+
+
+def write_xlsx(directory: str, rows: list[tuple]) -> str:
+    """يكتب ورقة واحدة (الصف الأول = العناوين) ويعيد مسار الملف"""
+    wb = Workbook()
+    ws = wb.active
+    for row in rows:
+        ws.append(row)
+    path = str(Path(directory) / "sheet.xlsx")
+    wb.save(path)
+    return path
+
+
+def make_member(username: str, role: str, *, committee=None, opportunity=None, is_active: bool = True, last4: str = "1234"):
+    """مستخدم + ملفه (ensure_profile ينشئ الملف؛ هنا نضبط الدور والربط)"""
+    user = User.objects.create(username=username)
+    MemberProfile.objects.filter(user=user).update(
+        national_id=username, mobile_last4=last4, role=role,
+        committee=committee, opportunity=opportunity, is_active=is_active,
+    )
+    return User.objects.get(pk=user.pk)
+
+
+# ==========================================================
+# Login
+# ==========================================================
+
+class LoginViewTests(TestCase):
+    def setUp(self):
+        self.opp = Opportunity.objects.create(name="فرصة")
+        self.com = Committee.objects.create(opportunity=self.opp, name="لجنة")
+
+    def login(self, national_id: str, last4: str, **kwargs):
+        return self.client.post(reverse("candidates:login"), {"national_id": national_id, "last4": last4}, **kwargs)
+
+    def test_success_redirects_straight_to_role_dashboard(self):
+        make_member("1001", MemberProfile.ROLE_SUPERVISOR, opportunity=self.opp)
+        make_member("1002", MemberProfile.ROLE_MEMBER, committee=self.com)
+
+        self.assertRedirects(self.login("1001", "1234"), reverse("candidates:supervisor_dashboard"))
+        self.assertEqual(self.client.session["_auth_user_id"], str(User.objects.get(username="1001").pk))
+
+        self.client.logout()
+        self.assertRedirects(self.login("1002", "1234"), reverse("candidates:committee_dashboard"))
+
+    def test_wrong_last4_is_rejected(self):
+        make_member("1001", MemberProfile.ROLE_SUPERVISOR, opportunity=self.opp)
+
+        response = self.login("1001", "9999", follow=True)
+        self.assertRedirects(response, reverse("candidates:login"))
+        self.assertContains(response, "بيانات الدخول غير صحيحة.")
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+    def test_inactive_profile_is_rejected(self):
+        make_member("1001", MemberProfile.ROLE_SUPERVISOR, opportunity=self.opp, is_active=False)
+
+        # الـ backend يستبعد الملفات غير المفعّلة، فالرسالة هي نفسها رسالة البيانات الخاطئة
+        response = self.login("1001", "1234", follow=True)
+        self.assertRedirects(response, reverse("candidates:login"))
+        self.assertContains(response, "بيانات الدخول غير صحيحة.")
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+
+# ==========================================================
+# Candidate scoring
+# ==========================================================
+
+class CandidateScoringTests(TestCase):
+    def setUp(self):
+        self.opp = Opportunity.objects.create(name="فرصة")
+        self.com = Committee.objects.create(opportunity=self.opp, name="لجنة")
+        self.cand = Candidate.objects.create(
+            opportunity=self.opp, full_name="مرشح", national_id="1", file_score=Decimal("40.5"),
+        )
+
+    def add_scores(self, *scores: str):
+        for score in scores:
+            member = User.objects.create(username=f"m{User.objects.count()}")
+            InterviewScore.objects.create(committee=self.com, candidate=self.cand, member=member, score=Decimal(score))
+
+    def test_average_needs_exactly_three_scores(self):
+        self.add_scores("40", "45.56")
+        self.assertEqual(self.cand.interview_avg(self.com), Decimal("0.00"))
+        self.assertEqual(self.cand.final_score(self.com), Decimal("40.50"))
+        self.assertEqual(self.cand.interview_and_final(4, 12000), (Decimal("0.00"), Decimal("40.50")))
+
+        self.add_scores("30")
+        self.assertEqual(self.cand.interview_avg(self.com), Decimal("38.52"))
+        self.assertEqual(self.cand.final_score(self.com), Decimal("79.02"))
+
+    def test_ineligible_or_unscored_file_gives_zero(self):
+        self.add_scores("40", "45", "50")
+
+        self.cand.file_not_eligible = True
+        self.assertEqual(self.cand.final_score(self.com), Decimal("0.00"))
+
+        self.cand.file_not_eligible = False
+        self.cand.file_score = None
+        self.assertEqual(self.cand.final_score(self.com), Decimal("0.00"))
+        self.assertEqual(self.cand.interview_avg(self.com), Decimal("45.00"))
+
+
+# ==========================================================
+# Distribution (POST)
+# ==========================================================
+
+class DistributionViewTests(TestCase):
+    def setUp(self):
+        self.opp = Opportunity.objects.create(name="فرصة")
+        self.com = Committee.objects.create(opportunity=self.opp, name="لجنة أ")
+        self.other_com = Committee.objects.create(opportunity=self.opp, name="لجنة ب")
+        self.client.force_login(User.objects.create(username="staff", is_staff=True))
+
+    def make_candidate(self, national_id: str, **fields) -> Candidate:
+        return Candidate.objects.create(opportunity=self.opp, full_name=f"مرشح {national_id}", national_id=national_id, **fields)
+
+    def distribute(self, cand: Candidate, committee: Committee):
+        return self.client.post(
+            reverse("candidates:distribution"),
+            {"candidate_id": cand.pk, "committee_id": committee.pk},
+            follow=True,
+        )
+
+    def assertCommittee(self, cand: Candidate, committee: Committee | None):
+        cand.refresh_from_db()
+        self.assertEqual(cand.assigned_committee_id, committee and committee.pk)
+
+    def test_ready_candidate_is_assigned(self):
+        scored = self.make_candidate("1", file_score=Decimal("30"))
+        not_eligible = self.make_candidate("2", file_not_eligible=True)
+
+        response = self.distribute(scored, self.com)
+        self.assertRedirects(response, reverse("candidates:distribution"))
+        self.assertContains(response, "تم توزيع المرشح على اللجنة.")
+        self.assertCommittee(scored, self.com)
+
+        self.distribute(not_eligible, self.other_com)
+        self.assertCommittee(not_eligible, self.other_com)
+
+    def test_assigning_again_keeps_first_committee(self):
+        cand = self.make_candidate("1", file_score=Decimal("30"))
+        self.distribute(cand, self.com)
+
+        response = self.distribute(cand, self.other_com)
+        self.assertContains(response, "تم توزيع هذا المرشح مسبقاً.")
+        self.assertCommittee(cand, self.com)
+
+    def test_candidate_without_file_score_is_not_ready(self):
+        cand = self.make_candidate("1")
+
+        response = self.distribute(cand, self.com)
+        self.assertContains(response, "هذا المرشح غير جاهز للتوزيع بعد.")
+        self.assertCommittee(cand, None)
+
+    def test_closed_or_foreign_committee_is_rejected(self):
+        cand = self.make_candidate("1", file_score=Decimal("30"))
+        closed = Committee.objects.create(opportunity=self.opp, name="مغلقة", is_open=False)
+        foreign = Committee.objects.create(opportunity=Opportunity.objects.create(name="أخرى", is_active=False), name="لجنة")
+
+        for committee in (closed, foreign):
+            response = self.distribute(cand, committee)
+            self.assertContains(response, "اللجنة غير موجودة أو غير مفتوحة.")
+            self.assertCommittee(cand, None)
+
+
+# ==========================================================
+# Committee scoring / chair finalize (POST)
+# ==========================================================
+
+class CommitteeScoringViewTests(TestCase):
+    def setUp(self):
+        self.opp = Opportunity.objects.create(name="فرصة")
+        self.com = Committee.objects.create(opportunity=self.opp, name="لجنة أ")
+        self.other_com = Committee.objects.create(opportunity=self.opp, name="لجنة ب")
+        self.cand = Candidate.objects.create(
+            opportunity=self.opp, full_name="مرشح", national_id="1",
+            file_score=Decimal("40.5"), assigned_committee=self.com,
+        )
+        self.chair = make_member("1001", MemberProfile.ROLE_CHAIR, committee=self.com)
+        self.members = [make_member(f"100{i}", MemberProfile.ROLE_MEMBER, committee=self.com) for i in (2, 3)]
+
+    def score(self, user, cand: Candidate, score: str, **kwargs):
+        self.client.force_login(user)
+        return self.client.post(reverse("candidates:committee_score", args=[cand.pk]), {"score": score}, **kwargs)
+
+    def finalize(self, cand: Candidate, reason: str = ""):
+        self.client.force_login(self.chair)
+        return self.client.post(
+            reverse("candidates:chair_finalize", args=[cand.pk]),
+            {"is_nominated": "1", "reason": reason},
+            follow=True,
+        )
+
+    def test_score_is_saved_once_per_member(self):
+        self.assertRedirects(self.score(self.members[0], self.cand, "40"), reverse("candidates:committee_dashboard"))
+        self.score(self.members[0], self.cand, "٤٥.٥")
+
+        self.assertEqual(
+            list(InterviewScore.objects.filter(candidate=self.cand).values_list("member_id", "score_x100")),
+            [(self.members[0].pk, 4550)],
+        )
+
+    def test_invalid_score_is_rejected(self):
+        for bad in ("", "50.01", "abc", "1e1"):
+            response = self.score(self.members[0], self.cand, bad, follow=True)
+            self.assertRedirects(response, reverse("candidates:committee_score", args=[self.cand.pk]))
+            self.assertContains(response, "أدخل درجة صحيحة بين 0 و 50.")
+        self.assertFalse(InterviewScore.objects.exists())
+
+    def test_candidate_of_other_committee_is_not_found(self):
+        foreign = Candidate.objects.create(
+            opportunity=self.opp, full_name="آخر", national_id="2",
+            file_score=Decimal("30"), assigned_committee=self.other_com,
+        )
+
+        self.assertEqual(self.score(self.members[0], foreign, "40").status_code, 404)
+        self.client.force_login(self.chair)
+        self.assertEqual(self.client.post(reverse("candidates:chair_finalize", args=[foreign.pk])).status_code, 404)
+        self.assertFalse(InterviewScore.objects.exists())
+        foreign.refresh_from_db()
+        self.assertFalse(foreign.is_finalized)
+
+    def test_finalize_stores_candidate_final_score(self):
+        for user, score in zip((self.chair, *self.members), ("40", "45.56", "30")):
+            self.score(user, self.cand, score)
+
+        response = self.finalize(self.cand)
+        self.assertContains(response, "تم اعتماد النتيجة وإرسالها للإدارة.")
+
+        self.cand.refresh_from_db()
+        self.assertTrue(self.cand.is_finalized)
+        self.assertEqual(self.cand.finalized_by_id, self.chair.pk)
+        decision = self.cand.final_decision
+        self.assertEqual(decision.final_score_value, Decimal("79.02"))
+        self.assertEqual(decision.final_score_value, self.cand.final_score(self.com))
+
+    def test_finalized_candidate_is_locked(self):
+        self.finalize(self.cand, reason="أول")
+
+        response = self.finalize(self.cand, reason="ثاني")
+        self.assertContains(response, "تم اعتماد المرشح مسبقاً.")
+        self.assertEqual(self.cand.final_decision.reason, "أول")
+
+        response = self.score(self.members[0], self.cand, "40", follow=True)
+        self.assertContains(response, "تم اعتماد المرشح نهائياً.")
+        self.assertFalse(InterviewScore.objects.exists())
+
+
+# ==========================================================
+# import_users_roles
+# ==========================================================
+
+USERS_HEADER = ("الهوية", "الاسم", "الدور", "تفعيل", "الفرصة", "اللجنة")
+
+
+class ImportUsersRolesTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def run_import(self, rows: list[tuple]) -> str:
+        out = StringIO()
+        call_command("import_users_roles", write_xlsx(self.tmp, [USERS_HEADER, *rows]), stdout=out)
+        return out.getvalue()
+
+    def test_import_creates_users_profiles_and_committees(self):
+        self.run_import([
+            ("1001", "أحمد", "chair", "نعم", "فرصة 1447", "اللجنة 1"),
+            ("1002", "سالم", "member", 1, "فرصة 1447", "اللجنة 1"),
+            ("1003", "خالد", "supervisor", "لا", "فرصة 1447", None),
+        ])
+
+        opp = Opportunity.objects.get(name="فرصة 1447")
+        com = Committee.objects.get(opportunity=opp, name="اللجنة 1")
+        self.assertEqual(User.objects.filter(username__in=["1001", "1002", "1003"]).count(), 3)
+
+        chair = MemberProfile.objects.get(user__username="1001")
+        self.assertEqual((chair.role, chair.committee_id, chair.opportunity_id, chair.is_active), ("chair", com.pk, opp.pk, True))
+        supervisor = MemberProfile.objects.get(user__username="1003")
+        self.assertEqual((supervisor.committee_id, supervisor.is_active), (None, False))
+
+    def test_duplicate_national_id_last_row_wins(self):
+        self.run_import([
+            ("2001", "الاسم الأول", "member", "نعم", "فرصة", "لجنة أ"),
+            ("2001", "الاسم الأخير", "supervisor", "نعم", "فرصة", None),
+        ])
+
+        user = User.objects.get(username="2001")
+        self.assertEqual(user.first_name, "الاسم الأخير")
+        self.assertEqual(user.profile.role, "supervisor")
+        self.assertIsNone(user.profile.committee_id)
+        self.assertEqual(MemberProfile.objects.filter(user=user).count(), 1)
+
+    def test_arabic_indic_digits_are_normalized(self):
+        self.run_import([
+            ("١٠٢٣-٤٥", "عربي", "supervisor", "نعم", "فرصة", None),
+            ("۳۴۵", "فارسي", "supervisor", "نعم", "فرصة", None),
+        ])
+
+        self.assertTrue(User.objects.filter(username="102345").exists())
+        self.assertTrue(User.objects.filter(username="345").exists())
+
+    def test_bad_row_after_first_batch_writes_nothing(self):
+        rows = [(str(3000 + i), f"اسم {i}", "supervisor", "نعم", "فرصة", None) for i in range(4)]
+        # عضو لجنة بدون لجنة: خطأ في الصف الخامس (بعد أول دفعتين)
+        rows.append(("3999", "بدون لجنة", "member", "نعم", "فرصة", None))
+
+        with mock.patch.object(import_users_roles, "BATCH_SIZE", 2):
+            with self.assertRaisesMessage(CommandError, "Row 6"):
+                self.run_import(rows)
+
+        self.assertFalse(User.objects.filter(username__startswith="3").exists())
+        self.assertFalse(Opportunity.objects.exists())
+
+    def test_reimport_updates_existing_rows(self):
+        self.run_import([
+            ("4001", "قديم", "member", "لا", "فرصة", "لجنة أ"),
+            ("4002", "ثابت", "supervisor", "نعم", "فرصة", None),
+        ])
+        out = self.run_import([
+            ("4001", "جديد", "chair", "نعم", "فرصة", "لجنة ب"),
+            ("4002", "ثابت", "supervisor", "نعم", "فرصة", None),
+        ])
+
+        user = User.objects.get(username="4001")
+        self.assertEqual(user.first_name, "جديد")
+        self.assertEqual((user.profile.role, user.profile.is_active), ("chair", True))
+        self.assertEqual(user.profile.committee.name, "لجنة ب")
+        self.assertEqual(User.objects.filter(username__startswith="400").count(), 2)
+        self.assertEqual(MemberProfile.objects.filter(user__username__startswith="400").count(), 2)
+        self.assertIn("Users created: 0 | existing users touched: 2", out)
+        self.assertIn("Profiles created: 0 | profiles updated: 2", out)
+
+    def test_empty_rows_cutoff_is_reported(self):
+        rows = [
+            ("5001", "قبل", "supervisor", "نعم", "فرصة", None),
+            *[(None,) * len(USERS_HEADER)] * 3,
+            ("5002", "بعد", "supervisor", "نعم", "فرصة", None),
+        ]
+
+        for dry in (False, True):
+            out = StringIO()
+            with mock.patch.object(import_users_roles, "MAX_EMPTY_ROWS", 2):
+                call_command("import_users_roles", write_xlsx(self.tmp, [USERS_HEADER, *rows]), dry_run=dry, stdout=out)
+
+            self.assertEqual(out.getvalue().count("توقفت القراءة عند الصف 5"), 1)
+        self.assertEqual(list(User.objects.filter(username__startswith="500").values_list("username", flat=True)), ["5001"])
+
+
+# ==========================================================
+# import_candidates_excel
+# ==========================================================
+
+class ImportCandidatesExcelTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        from candidates.management.commands.import_candidates_excel import AR_MAP
+
+        header = tuple(AR_MAP)
+        row = {h: "" for h in header}
+        row.update({"اسم المتقدم": "مرشح", "السجل المدني": "5001", "رقم الجوال": "٠٥٠ ١٢٣"})
+        self.path = write_xlsx(tmp.name, [header, tuple(row[h] for h in header)])
+
+    def test_rerun_after_outer_rollback(self):
+        # ما أُنشئ داخل transaction أُلغيت لا يُعاد استخدامه في التشغيل التالي
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            call_command("import_candidates_excel", self.path, opportunity="فرصة", committee="لجنة", assign=True, stdout=StringIO())
+            raise RuntimeError
+
+        call_command("import_candidates_excel", self.path, opportunity="فرصة", committee="لجنة", assign=True, stdout=StringIO())
+
+        cand = Candidate.objects.get(national_id="5001")
+        self.assertEqual(cand.opportunity.name, "فرصة")
+        self.assertEqual(cand.assigned_committee.name, "لجنة")
+        self.assertEqual(cand.mobile, "٠٥٠١٢٣")
+
+
+# ==========================================================
+# Migration 0007 (score -> score_x100)
+# ==========================================================
+
+class InterviewScoreX100MigrationTests(TransactionTestCase):
+    before = [("candidates", "0006_drop_redundant_national_id_indexes")]
+    after = [("candidates", "0007_interviewscore_score_x100")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_round_trip(self):
+        apps = self.migrate(self.before)
+        user = apps.get_model("auth", "User").objects.create(username="m")
+        opp = apps.get_model("candidates", "Opportunity").objects.create(name="o")
+        com = apps.get_model("candidates", "Committee").objects.create(name="c", opportunity=opp)
+        cand = apps.get_model("candidates", "Candidate").objects.create(opportunity=opp, full_name="n", national_id="1")
+        OldScore = apps.get_model("candidates", "InterviewScore")
+        for member_name, score in (("m", "45.50"), ("m2", "0.05"), ("m3", "50.00")):
+            member = user if member_name == "m" else apps.get_model("auth", "User").objects.create(username=member_name)
+            OldScore.objects.create(committee=com, candidate=cand, member=member, score=Decimal(score))
+
+        apps = self.migrate(self.after)
+        NewScore = apps.get_model("candidates", "InterviewScore")
+        self.assertEqual(
+            sorted(NewScore.objects.values_list("score_x100", flat=True)),
+            [5, 4550, 5000],
+        )
+
+        apps = self.migrate(self.before)
+        OldScore = apps.get_model("candidates", "InterviewScore")
+        self.assertEqual(
+            sorted(OldScore.objects.values_list("score", flat=True)),
+            [Decimal("0.05"), Decimal("45.50"), Decimal("50.00")],
+        )
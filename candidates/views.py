@@ -1,13 +1,15 @@
 from __future__ import annotations
 
-from decimal import Decimal, InvalidOperation
+import re
+from decimal import Decimal
 
 from django.contrib import messages
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import authenticate, get_user_model, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
+from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Q, Count
+from django.db.models import Count, Exists, OuterRef, Q, Sum
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
@@ -15,6 +17,11 @@ from django.views.decorators.http import require_http_methods
 
 from .models import Candidate, Committee, FinalDecision, InterviewScore, MemberProfile, Opportunity
 
+DISTRIBUTION_PAGE_SIZE = 50
+
+_SCORE_RE = re.compile(r"\d{1,2}(?:\.\d+)?\Z")
+_SCORE_MAX = Decimal(50)
+
 
 # ==========================================================
 # Helpers
@@ -23,7 +30,15 @@ from .models import Candidate, Committee, FinalDecision, InterviewScore, MemberP
 def get_profile(request: HttpRequest) -> MemberProfile | None:
     if not request.user.is_authenticated:
         return None
-    return getattr(request.user, "profile", None)
+    user = request.user
+    # جلسات NationalIdLast4Backend تحمّل profile + الفرصة/اللجنة مع المستخدم (get_user)
+    if get_user_model().profile.is_cached(user):
+        return getattr(user, "profile", None)
+    # غيرها (ModelBackend عبر دخول /admin/): استعلام JOIN واحد، ويُحفظ على المستخدم فيستفيد منه القالب أيضًا
+    p = MemberProfile.objects.select_related("opportunity", "committee").filter(user=user).first()
+    if p is not None:
+        user.profile = p
+    return p
 
 
 def require_role(request: HttpRequest, roles: set[str]) -> MemberProfile | HttpResponse:
@@ -38,18 +53,29 @@ def require_role(request: HttpRequest, roles: set[str]) -> MemberProfile | HttpR
     return p
 
 
+def dashboard_url_name(p: MemberProfile) -> str:
+    """لوحة الدور مباشرة (يستخدمها home و login بدل تحويلين متتاليين)"""
+    if p.role == MemberProfile.ROLE_SUPERVISOR:
+        return "candidates:supervisor_dashboard"
+    if p.role in (MemberProfile.ROLE_MEMBER, MemberProfile.ROLE_CHAIR):
+        return "candidates:committee_dashboard"
+    return "candidates:admin_dashboard"
+
+
 def get_active_opportunity_for_profile(p: MemberProfile) -> Opportunity | None:
     if getattr(p, "opportunity_id", None):
         return p.opportunity
-    return Opportunity.objects.filter(is_active=True).first()
+    return Opportunity.get_active()
 
 
 def parse_decimal_0_50(value: str) -> Decimal | None:
-    try:
-        v = Decimal((value or "").strip())
-    except (InvalidOperation, ValueError):
+    s = (value or "").strip()
+    # فحص الشكل أولًا (رقمان كحد أقصى + كسر اختياري): يرفض النص/الأسس/NaN بدون بناء Decimal
+    # \d تقبل الأرقام العربية أيضًا (Decimal يفهمها)
+    if not _SCORE_RE.match(s):
         return None
-    if v < 0 or v > 50:
+    v = Decimal(s)
+    if v > _SCORE_MAX:
         return None
     return v
 
@@ -82,11 +108,7 @@ def home(request: HttpRequest) -> HttpResponse:
             logout(request)
         return redirect("candidates:login")
 
-    if p.role == MemberProfile.ROLE_SUPERVISOR:
-        return redirect("candidates:supervisor_dashboard")
-    if p.role in (MemberProfile.ROLE_MEMBER, MemberProfile.ROLE_CHAIR):
-        return redirect("candidates:committee_dashboard")
-    return redirect("candidates:admin_dashboard")
+    return redirect(dashboard_url_name(p))
 
 
 # ==========================================================
@@ -100,7 +122,7 @@ def login_view(request: HttpRequest) -> HttpResponse:
     if request.user.is_authenticated:
         p = getattr(request.user, "profile", None)
         if p and getattr(p, "is_active", False):
-            return redirect("candidates:home")
+            return redirect(dashboard_url_name(p))
 
         logout(request)
         messages.error(request, "حسابك غير مرتبط بملف صلاحيات أو غير مفعّل. راجع الإدارة.")
@@ -125,7 +147,7 @@ def login_view(request: HttpRequest) -> HttpResponse:
             return redirect("candidates:login")
 
         login(request, user, backend="candidates.auth_backend.NationalIdLast4Backend")
-        return redirect("candidates:home")
+        return redirect(dashboard_url_name(p))
 
     return render(request, "candidates/login.html")
 
@@ -155,15 +177,19 @@ def supervisor_dashboard(request: HttpRequest) -> HttpResponse:
     q = (request.GET.get("q") or "").strip()
     qs = apply_search(qs, q)
 
-    pending = qs.filter(file_score__isnull=True, file_not_eligible=False)
-    done = qs.filter(Q(file_score__isnull=False) | Q(file_not_eligible=True))
-
-    stats = {
-        "total": qs.count(),
-        "pending": pending.count(),
-        "done": done.count(),
-        "assigned": qs.filter(assigned_committee__isnull=False).count(),
-    }
+    pending_q = Q(file_score__isnull=True, file_not_eligible=False)
+    done_q = Q(file_score__isnull=False) | Q(file_not_eligible=True)
+    # القوائم للعرض فقط → dicts بالأعمدة المعروضة (بدون بناء كائنات Candidate، واسم اللجنة بـ JOIN)
+    pending = qs.filter(pending_q).values("id", "full_name")
+    done = qs.filter(done_q).values("id", "full_name", "file_score", "file_not_eligible", "assigned_committee__name")
+
+    # كل الإحصاءات باستعلام واحد (COUNT ... FILTER) بدل أربعة
+    stats = qs.aggregate(
+        total=Count("id"),
+        pending=Count("id", filter=pending_q),
+        done=Count("id", filter=done_q),
+        assigned=Count("id", filter=Q(assigned_committee__isnull=False)),
+    )
 
     return render(
         request,
@@ -193,25 +219,22 @@ def file_score_view(request: HttpRequest, pk: int) -> HttpResponse:
             messages.error(request, "لم يتم ربط المشرف بفرصة. راجع الإدارة.")
             return redirect("candidates:login")
 
-        cand = get_object_or_404(Candidate, pk=pk, opportunity=p.opportunity)
+        scope = {"opportunity_id": p.opportunity_id}
         back_url = "candidates:supervisor_dashboard"
     else:
         if not p.committee_id:
             messages.error(request, "لم يتم ربط حسابك بلجنة. راجع الإدارة.")
             return redirect("candidates:login")
 
-        cand = get_object_or_404(Candidate, pk=pk, assigned_committee=p.committee)
+        scope = {"assigned_committee_id": p.committee_id}
         back_url = "candidates:committee_dashboard"
 
-    if cand.is_finalized:
-        messages.error(request, "تم اعتماد هذا المرشح نهائياً ولا يمكن تعديله.")
-        return redirect(back_url)
-
     if request.method == "POST":
         action = (request.POST.get("action") or "").strip()
 
         with transaction.atomic():
-            cand = Candidate.objects.select_for_update().get(pk=cand.pk)
+            # POST: قراءة واحدة مقفلة ضمن نطاق المستخدم (بدل قراءة ثم select_for_update)
+            cand = get_object_or_404(Candidate.objects.select_for_update(), pk=pk, **scope)
 
             if cand.is_finalized:
                 messages.error(request, "تم اعتماد هذا المرشح نهائياً ولا يمكن تعديله.")
@@ -239,6 +262,11 @@ def file_score_view(request: HttpRequest, pk: int) -> HttpResponse:
         messages.success(request, "تم حفظ تقييم الملف.")
         return redirect(back_url)
 
+    cand = get_object_or_404(Candidate, pk=pk, **scope)
+    if cand.is_finalized:
+        messages.error(request, "تم اعتماد هذا المرشح نهائياً ولا يمكن تعديله.")
+        return redirect(back_url)
+
     return render(request, "candidates/file_score.html", {"c": cand, "back_url": back_url})
 
 
@@ -258,28 +286,29 @@ def admin_dashboard(request: HttpRequest) -> HttpResponse:
         return redirect("candidates:login")
 
     qs = Candidate.objects.filter(opportunity=opp)
-    total = qs.count()
-    ready = qs.filter(Q(file_score__isnull=False) | Q(file_not_eligible=True)).count()
-    assigned = qs.filter(assigned_committee__isnull=False).count()
-    finalized = qs.filter(is_finalized=True).count()
+    # باقي الإحصاءات باستعلام واحد (COUNT ... FILTER)
+    stats = qs.aggregate(
+        total=Count("id"),
+        ready=Count("id", filter=Q(file_score__isnull=False) | Q(file_not_eligible=True)),
+        finalized=Count("id", filter=Q(is_finalized=True)),
+    )
 
     committees = Committee.objects.filter(opportunity=opp).order_by("name")
-    committee_counts = (
+    committee_counts = list(
         qs.filter(assigned_committee__isnull=False)
         .values("assigned_committee__name")
         .annotate(c=Count("id"))
         .order_by("assigned_committee__name")
     )
+    # عدد الموزّعين = مجموع أعداد اللجان (بدون COUNT إضافي)
+    stats["assigned"] = sum(r["c"] for r in committee_counts)
 
     return render(
         request,
         "candidates/admin_dashboard.html",
         {
             "opportunity": opp,
-            "total": total,
-            "ready": ready,
-            "assigned": assigned,
-            "finalized": finalized,
+            **stats,
             "committees": committees,
             "committee_counts": committee_counts,
         },
@@ -289,7 +318,7 @@ def admin_dashboard(request: HttpRequest) -> HttpResponse:
 @staff_member_required
 @require_http_methods(["GET", "POST"])
 def distribution_view(request: HttpRequest) -> HttpResponse:
-    opp = Opportunity.objects.filter(is_active=True).first()
+    opp = Opportunity.get_active()
     if not opp:
         messages.error(request, "لا توجد فرصة فعّالة.")
         return redirect("candidates:admin_dashboard")
@@ -300,7 +329,9 @@ def distribution_view(request: HttpRequest) -> HttpResponse:
         Candidate.objects.filter(opportunity=opp)
         .filter(Q(file_score__isnull=False) | Q(file_not_eligible=True))
         .filter(assigned_committee__isnull=True)
-        .order_by("full_name")
+        # القائمة تحتاج هذه الأعمدة فقط
+        .only("id", "full_name", "file_score", "file_not_eligible")
+        .order_by("full_name", "id")
     )
 
     q = (request.GET.get("q") or "").strip()
@@ -318,35 +349,37 @@ def distribution_view(request: HttpRequest) -> HttpResponse:
             messages.error(request, "اختر مرشحًا ولجنة.")
             return redirect("candidates:distribution")
 
-        with transaction.atomic():
-            cand = Candidate.objects.select_for_update().filter(pk=cand_id, opportunity=opp).first()
-            com = Committee.objects.filter(pk=committee_id, opportunity=opp, is_open=True).first()
-
-            if not cand:
-                messages.error(request, "المرشح غير موجود.")
-                return redirect("candidates:distribution")
-            if not com:
-                messages.error(request, "اللجنة غير موجودة أو غير مفتوحة.")
-                return redirect("candidates:distribution")
-
-            if cand.file_score is None and not cand.file_not_eligible:
-                messages.error(request, "هذا المرشح غير جاهز للتوزيع بعد.")
-                return redirect("candidates:distribution")
-
-            if cand.assigned_committee_id:
-                messages.info(request, "تم توزيع هذا المرشح مسبقاً.")
-                return redirect("candidates:distribution")
+        if not Committee.objects.filter(pk=committee_id, opportunity=opp, is_open=True).exists():
+            messages.error(request, "اللجنة غير موجودة أو غير مفتوحة.")
+            return redirect("candidates:distribution")
 
-            cand.assigned_committee = com
-            cand.save(update_fields=["assigned_committee"])
+        # UPDATE واحد مشروط (جاهز + غير موزّع) بدل قفل الصف ثم الحفظ؛ شرط WHERE يكفي ضد التوزيع المزدوج
+        updated = (
+            Candidate.objects.filter(pk=cand_id, opportunity=opp, assigned_committee__isnull=True)
+            .filter(Q(file_score__isnull=False) | Q(file_not_eligible=True))
+            .update(assigned_committee_id=committee_id)
+        )
+        if updated:
+            messages.success(request, "تم توزيع المرشح على اللجنة.")
+            return redirect("candidates:distribution")
 
-        messages.success(request, "تم توزيع المرشح على اللجنة.")
+        # لم يُحدَّث شيء: نحدد السبب فقط في هذا المسار
+        cand = Candidate.objects.filter(pk=cand_id, opportunity=opp).only("assigned_committee", "file_score", "file_not_eligible").first()
+        if not cand:
+            messages.error(request, "المرشح غير موجود.")
+        elif cand.assigned_committee_id:
+            messages.info(request, "تم توزيع هذا المرشح مسبقاً.")
+        else:
+            messages.error(request, "هذا المرشح غير جاهز للتوزيع بعد.")
         return redirect("candidates:distribution")
 
+    # صفحة واحدة (DISTRIBUTION_PAGE_SIZE) بدل كل الجاهزين دفعة واحدة
+    page = Paginator(ready_unassigned, DISTRIBUTION_PAGE_SIZE).get_page(request.GET.get("page"))
+
     return render(
         request,
         "candidates/distribution.html",
-        {"opportunity": opp, "committees": committees, "ready": ready_unassigned, "q": q},
+        {"opportunity": opp, "committees": committees, "ready": page.object_list, "page": page, "q": q},
     )
 
 
@@ -370,16 +403,24 @@ def committee_dashboard(request: HttpRequest) -> HttpResponse:
     q = (request.GET.get("q") or "").strip()
     qs = apply_search(qs, q)
 
-    scored_ids = set(
-        InterviewScore.objects.filter(committee=com, member=request.user).values_list("candidate_id", flat=True)
+    # هل قيّمتُ المرشح؟ يُحسب ضمن نفس استعلام القائمة (EXISTS) بدل استعلام منفصل
+    # dicts بالأعمدة المعروضة فقط (بدون بناء كائنات Candidate)
+    candidates = list(
+        qs.annotate(
+            is_scored=Exists(
+                InterviewScore.objects.filter(committee=com, member=request.user, candidate=OuterRef("pk"))
+            )
+        ).values("id", "full_name", "file_score", "file_not_eligible", "is_finalized", "is_scored")
     )
+    scored_ids = {c["id"] for c in candidates if c["is_scored"]}
 
     tasks = None
     if p.role == MemberProfile.ROLE_CHAIR:
+        # القائمة محمّلة كاملة أعلاه (نفس الفلتر والبحث) → العدّ منها بدون أي استعلام
         tasks = {
-            "pending_file": qs.filter(file_score__isnull=True, file_not_eligible=False).count(),
-            "pending_interview": qs.exclude(id__in=scored_ids).filter(is_finalized=False).count(),
-            "pending_finalize": qs.filter(is_finalized=False).count(),
+            "pending_file": sum(1 for c in candidates if c["file_score"] is None and not c["file_not_eligible"]),
+            "pending_interview": sum(1 for c in candidates if not c["is_scored"] and not c["is_finalized"]),
+            "pending_finalize": sum(1 for c in candidates if not c["is_finalized"]),
         }
 
     return render(
@@ -387,7 +428,7 @@ def committee_dashboard(request: HttpRequest) -> HttpResponse:
         "candidates/committee_dashboard.html",
         {
             "committee": com,
-            "candidates": qs,
+            "candidates": candidates,
             "scored_ids": scored_ids,
             "is_chair": p.role == MemberProfile.ROLE_CHAIR,
             "q": q,
@@ -408,28 +449,21 @@ def committee_score(request: HttpRequest, pk: int) -> HttpResponse:
         messages.error(request, "لم يتم ربط حسابك بلجنة.")
         return redirect("candidates:login")
 
-    cand = get_object_or_404(Candidate, pk=pk, assigned_committee=com)
-
-    if cand.is_finalized:
-        messages.error(request, "تم اعتماد المرشح نهائياً.")
-        return redirect("candidates:committee_dashboard")
-
-    my_score = InterviewScore.objects.filter(committee=com, candidate=cand, member=request.user).first()
-
     if request.method == "POST":
         v = parse_decimal_0_50(request.POST.get("score") or "")
         notes = (request.POST.get("notes") or "").strip()
 
-        if v is None:
-            messages.error(request, "أدخل درجة صحيحة بين 0 و 50.")
-            return redirect("candidates:committee_score", pk=cand.pk)
-
         with transaction.atomic():
-            cand = Candidate.objects.select_for_update().get(pk=cand.pk)
+            # POST: قراءة واحدة مقفلة ضمن لجنة العضو (بدل قراءة ثم select_for_update)
+            cand = get_object_or_404(Candidate.objects.select_for_update(), pk=pk, assigned_committee=com)
             if cand.is_finalized:
                 messages.error(request, "تم اعتماد المرشح نهائياً.")
                 return redirect("candidates:committee_dashboard")
 
+            if v is None:
+                messages.error(request, "أدخل درجة صحيحة بين 0 و 50.")
+                return redirect("candidates:committee_score", pk=cand.pk)
+
             InterviewScore.objects.update_or_create(
                 committee=com,
                 candidate=cand,
@@ -440,6 +474,13 @@ def committee_score(request: HttpRequest, pk: int) -> HttpResponse:
         messages.success(request, "تم حفظ درجة المقابلة.")
         return redirect("candidates:committee_dashboard")
 
+    cand = get_object_or_404(Candidate, pk=pk, assigned_committee=com)
+    if cand.is_finalized:
+        messages.error(request, "تم اعتماد المرشح نهائياً.")
+        return redirect("candidates:committee_dashboard")
+
+    my_score = InterviewScore.objects.filter(committee=com, candidate=cand, member=request.user).first()
+
     return render(request, "candidates/committee_score.html", {"c": cand, "committee": com, "my_score": my_score})
 
 
@@ -455,29 +496,23 @@ def chair_finalize(request: HttpRequest, pk: int) -> HttpResponse:
         messages.error(request, "لم يتم ربط حسابك بلجنة.")
         return redirect("candidates:login")
 
-    cand = get_object_or_404(Candidate, pk=pk, assigned_committee=com)
-
-    scores = list(
-        InterviewScore.objects.filter(committee=com, candidate=cand)
-        .select_related("member")
-        .order_by("created_at")
-    )
-
-    avg = Decimal(str(cand.interview_avg(com)))
-    total = Decimal(str(cand.final_score(com)))
-
-    prev = FinalDecision.objects.filter(committee=com, candidate=cand).first()
-
     if request.method == "POST":
         nominated = (request.POST.get("is_nominated") or "") == "1"
         reason = (request.POST.get("reason") or "").strip()
 
         with transaction.atomic():
-            cand = Candidate.objects.select_for_update().get(pk=cand.pk)
+            # POST: قراءة واحدة مقفلة ضمن لجنة الرئيس (بدل قراءة ثم select_for_update)
+            cand = get_object_or_404(Candidate.objects.select_for_update(), pk=pk, assigned_committee=com)
             if cand.is_finalized:
                 messages.info(request, "تم اعتماد المرشح مسبقاً.")
                 return redirect("candidates:committee_dashboard")
 
+            # عدد ومجموع درجات اللجنة باستعلام تجميعي واحد
+            agg = InterviewScore.objects.filter(committee=com, candidate=cand).aggregate(
+                n=Count("id"), sum_x100=Sum("score_x100"),
+            )
+            _avg, total = cand.interview_and_final(agg["n"], agg["sum_x100"] or 0)
+
             FinalDecision.objects.update_or_create(
                 committee=com,
                 candidate=cand,
@@ -497,6 +532,18 @@ def chair_finalize(request: HttpRequest, pk: int) -> HttpResponse:
         messages.success(request, "تم اعتماد النتيجة وإرسالها للإدارة.")
         return redirect("candidates:committee_dashboard")
 
+    cand = get_object_or_404(Candidate, pk=pk, assigned_committee=com)
+
+    scores = list(
+        InterviewScore.objects.filter(committee=com, candidate=cand)
+        .select_related("member")
+        .order_by("created_at")
+    )
+    # نفس الدرجات المعروضة تكفي للحساب (بدون استعلام إضافي)
+    avg, total = cand.interview_and_final(len(scores), sum(s.score_x100 for s in scores))
+
+    prev = FinalDecision.objects.filter(committee=com, candidate=cand).first()
+
     return render(
         request,
         "candidates/chair_finalize.html",